@@ -0,0 +1,56 @@
+"""Deterministic synthetic events and menus for the benchmarks."""
+import random
+from datetime import date, timedelta
+
+EVENT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+MENU_SIZES = (10, 100, 1_000, 5_000)
+ITEMS_PER_SECTION = 20
+
+_WORDS = (
+    "trivia taco karaoke brisket cider lager stout draft smoked burger salsa bingo music "
+    "night open mic tap takeover hazy pilsner kombucha patio special live band football"
+).split()
+
+
+def _sentence(rng, low, high):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def make_events(count, seed=0, today=None):
+    """`count` events spread over a year either side of `today`; about 5% are pinned."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    events = []
+    for _ in range(count):
+        pinned = rng.random() < 0.05
+        events.append(
+            {
+                "title": _sentence(rng, 2, 6)[:80],
+                "date": today + timedelta(days=rng.randint(-365, 365)),
+                "description": _sentence(rng, 5, 50)[:400],
+                "pinned": pinned,
+            }
+        )
+    return events
+
+
+def make_menu(item_count, seed=0):
+    """A menu with `item_count` items in sections of ITEMS_PER_SECTION."""
+    rng = random.Random(seed)
+    menu = []
+    for start in range(0, item_count, ITEMS_PER_SECTION):
+        items = [
+            {"name": _sentence(rng, 1, 4)[:80], "description": _sentence(rng, 4, 40)[:400]}
+            for _ in range(min(ITEMS_PER_SECTION, item_count - start))
+        ]
+        menu.append({"section": f"Section {len(menu) + 1}", "items": items})
+    return menu
+
+
+def make_text(length, seed=0):
+    """Form-like text of `length` characters with newlines, tabs and a control character."""
+    rng = random.Random(seed)
+    text = ""
+    while len(text) < length:
+        text += _sentence(rng, 3, 12) + rng.choice((". ", ".\n", "\t", "\x07 "))
+    return text[:length]
@@ -0,0 +1,293 @@
+"""Load-test the app under gunicorn on localhost with mixed public/admin traffic.
+
+    python benchmarks/loadtest.py [--scenario benchmarks/scenarios/mixed.json]
+                                  [--workers 2] [--threads 4] [--clients 16] [--duration 10]
+                                  [--sweep 1x4,2x2,2x4,4x2] [--events 1000] [--output results.json]
+
+Each run starts gunicorn in a scratch directory (a copy of data/menu.json plus
+optional synthetic events), logs in once as admin, then drives the scenario's
+weighted request mix from `--clients` keep-alive connections spread over
+`--procs` processes. It reports throughput and p50/p95/p99 latency overall and
+per request. `--sweep` repeats that for each WORKERSxTHREADS configuration.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios", "mixed.json")
+ADMIN_PASSWORD = "loadtest"
+CSRF_FIELD = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles (ms) and status counts for (name, status, seconds) samples."""
+
+    def stats(rows):
+        latencies = sorted(seconds * 1000 for _, _, seconds in rows)
+        statuses = {}
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(rows),
+            "rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "statuses": statuses,
+        }
+
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample[0], []).append(sample)
+    return {"overall": stats(samples), "by_request": {name: stats(rows) for name, rows in sorted(by_name.items())}}
+
+
+def error_rate(stats):
+    """Share of requests that failed outright or got a 5xx (including shed 503s)."""
+    failed = sum(count for status, count in stats["statuses"].items() if status == "error" or status.startswith("5"))
+    return failed / stats["requests"] if stats["requests"] else 0.0
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _prepare_workdir(workdir, event_count):
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    shutil.copy(os.path.join(ROOT, "data", "menu.json"), os.path.join(workdir, "data", "menu.json"))
+    if event_count:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from datasets import make_events
+
+        with open(os.path.join(workdir, "data", "events.json"), "w") as f:
+            json.dump(make_events(event_count), f, default=str)
+
+
+def start_server(workdir, port, workers, threads, config=None):
+    env = {
+        **os.environ,
+        "FLASK_SECRET_KEY": "loadtest",
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "CONTENT_STORE": os.environ.get("CONTENT_STORE", "json"),
+    }
+    command = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--pythonpath", ROOT,
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+    ]
+    if config:
+        command += ["--config", config]
+    log = open(os.path.join(workdir, "gunicorn.log"), "ab")
+    server = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=log)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited early; see {workdir}/gunicorn.log")
+        try:
+            conn = HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("gunicorn did not become healthy within 30s")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def _cookie(response, current=None):
+    header = response.getheader("Set-Cookie")
+    return header.split(";", 1)[0] if header else current
+
+
+def admin_login(port):
+    """Log in once; every client reuses the signed session cookie and its CSRF token."""
+    conn = HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/admin")
+    response = conn.getresponse()
+    cookie = _cookie(response)
+    token = CSRF_FIELD.search(response.read().decode()).group(1)
+    body = urlencode({"username": "admin", "password": ADMIN_PASSWORD, "csrf_token": token})
+    headers = {"Cookie": cookie, "Content-Type": "application/x-www-form-urlencoded"}
+    conn.request("POST", "/admin", body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    if response.status != 302:
+        raise RuntimeError(f"admin login failed with status {response.status}")
+    return _cookie(response, cookie), token
+
+
+def _client(port, requests, cookie, token, deadline, seed, samples):
+    rng = random.Random(seed)
+    weights = [spec.get("weight", 1) for spec in requests]
+    conn = HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < deadline:
+        spec = rng.choices(requests, weights)[0]
+        method = spec.get("method", "GET")
+        headers = {"Accept-Encoding": "br, gzip"}
+        body = None
+        if spec.get("admin"):
+            headers["Cookie"] = cookie
+        if method == "POST":
+            data = {key: value.replace("{today}", date.today().isoformat()) for key, value in spec.get("data", {}).items()}
+            body = urlencode({**data, "csrf_token": token})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        start = time.perf_counter()
+        try:
+            conn.request(method, spec["path"], body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except OSError:
+            status = "error"
+            conn.close()
+            conn = HTTPConnection("127.0.0.1", port, timeout=30)
+        samples.append((spec.get("name", spec["path"]), status, time.perf_counter() - start))
+
+
+def _client_process(port, requests, cookie, token, deadline, clients, seed, results):
+    samples = []
+    threads = [
+        threading.Thread(target=_client, args=(port, requests, cookie, token, deadline, seed + index, samples))
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(samples)
+
+
+def drive(port, requests, clients, duration, procs):
+    """Run `clients` connections for `duration` seconds; returns (samples, elapsed seconds)."""
+    cookie, token = admin_login(port)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    procs = max(1, min(procs, clients))
+    started = time.monotonic()
+    deadline = started + duration
+    workers = []
+    for index in range(procs):
+        share = clients // procs + (1 if index < clients % procs else 0)
+        workers.append(
+            context.Process(target=_client_process, args=(port, requests, cookie, token, deadline, share, index * 1000, results))
+        )
+    for worker in workers:
+        worker.start()
+    samples = []
+    for _ in workers:
+        samples.extend(results.get())
+    for worker in workers:
+        worker.join()
+    return samples, time.monotonic() - started
+
+
+def run_config(scenario, workers, threads, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        _prepare_workdir(workdir, args.events)
+        port = _free_port()
+        server = start_server(workdir, port, workers, threads, args.gunicorn_config)
+        try:
+            if args.warmup:
+                drive(port, scenario["requests"], args.clients, args.warmup, args.procs)
+            samples, elapsed = drive(port, scenario["requests"], args.clients, args.duration, args.procs)
+        finally:
+            stop_server(server)
+    return {"workers": workers, "threads": threads, **summarize(samples, elapsed)}
+
+
+def parse_sweep(value):
+    configs = []
+    for part in value.split(","):
+        workers, threads = part.lower().split("x")
+        configs.append((int(workers), int(threads)))
+    return configs
+
+
+def _print_row(label, stats):
+    statuses = " ".join(f"{status}:{count}" for status, count in sorted(stats["statuses"].items()))
+    print(
+        f"{label:<16} {stats['rps']:>9.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}  {statuses}"
+    )
+
+
+def _print_header(first_column):
+    print(f"{first_column:<16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app under gunicorn on localhost.")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, help="scenario JSON (weighted request mix)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--sweep", type=parse_sweep, help="comma-separated WORKERSxTHREADS configs, e.g. 1x4,2x2,4x1")
+    parser.add_argument("--clients", type=int, help="concurrent connections (default from scenario)")
+    parser.add_argument("--duration", type=float, help="seconds per run (default from scenario)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured traffic first")
+    parser.add_argument("--procs", type=int, default=min(4, os.cpu_count() or 1), help="load-generator processes")
+    parser.add_argument("--events", type=int, default=100, help="synthetic events to seed")
+    parser.add_argument("--gunicorn-config", help="gunicorn config file to pass with --config")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    args.clients = args.clients or scenario.get("clients", 16)
+    args.duration = args.duration or scenario.get("duration", 10)
+
+    configs = args.sweep or [(args.workers, args.threads)]
+    results = []
+    for workers, threads in configs:
+        print(f"Running {workers} worker(s) x {threads} thread(s), {args.clients} clients for {args.duration}s...", flush=True)
+        results.append(run_config(scenario, workers, threads, args))
+
+    if len(results) == 1:
+        _print_header("request")
+        for name, stats in results[0]["by_request"].items():
+            _print_row(name, stats)
+    _print_header("workers x threads")
+    for result in results:
+        _print_row(f"{result['workers']}x{result['threads']}", result["overall"])
+    if len(results) > 1:
+        healthy = [r for r in results if error_rate(r["overall"]) < 0.01]
+        best = max(healthy or results, key=lambda r: r["overall"]["rps"])
+        print(f"Best throughput: {best['workers']}x{best['threads']} ({best['overall']['rps']:.1f} req/s)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"scenario": args.scenario, "clients": args.clients, "duration": args.duration, "runs": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
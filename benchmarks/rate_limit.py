@@ -0,0 +1,87 @@
+"""Compare the shared SQLite rate-limit storage with memory://.
+
+    python benchmarks/rate_limit.py [--checks 5000] [--processes 4]
+
+Reports per-check latency in one process, then runs the same limit from several
+processes at once to show aggregate throughput and how many hits each backend
+counted (memory:// only ever sees its own process's hits).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter  # noqa: E402
+
+import taps_and_takeout.rate_limit  # noqa: E402,F401  (registers sqlite://)
+
+LIMIT = parse("1000000 per hour")
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _timed_checks(limiter, checks, key):
+    samples = []
+    for _ in range(checks):
+        start = time.perf_counter()
+        limiter.hit(LIMIT, key)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _worker(uri, checks, results):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    _timed_checks(limiter, checks, "shared")
+    results.put(limiter.get_window_stats(LIMIT, "shared").remaining)
+
+
+def run(uri, checks, processes):
+    samples = _timed_checks(FixedWindowRateLimiter(storage_from_string(uri)), checks, "single")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(uri, checks, results)) for _ in range(processes)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    counted = max(LIMIT.amount - remaining for remaining in outcomes)
+    return {
+        "p50_us": _percentile(samples, 0.5) * 1e6,
+        "p99_us": _percentile(samples, 0.99) * 1e6,
+        "checks_per_s": processes * checks / elapsed,
+        "counted": counted,
+        "expected": processes * checks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checks", type=int, default=5000, help="rate-limit checks per process")
+    parser.add_argument("--processes", type=int, default=4, help="concurrent worker processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {"memory://": "memory://", "sqlite": f"sqlite:///{directory}/ratelimit.db"}
+        print(f"{'backend':<10} {'p50 µs':>8} {'p99 µs':>8} {'checks/s':>10} {'counted':>16}")
+        for name, uri in backends.items():
+            result = run(uri, args.checks, args.processes)
+            print(
+                f"{name:<10} {result['p50_us']:>8.1f} {result['p99_us']:>8.1f} {result['checks_per_s']:>10.0f}"
+                f" {result['counted']:>7}/{result['expected']:<8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measure worker cold start with and without the Jinja bytecode cache.
+
+    python benchmarks/startup.py [--runs 5]
+
+Each run is a fresh interpreter, like a newly booted gunicorn worker. It times
+importing the app, create_app(), loading every template and the first render of
+/menu and /admin-events.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = r"""
+import json, time
+started = time.perf_counter()
+from taps_and_takeout import create_app
+imported = time.perf_counter()
+app = create_app()
+app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+created = time.perf_counter()
+for name in app.jinja_env.list_templates():
+    app.jinja_env.get_template(name)
+compiled = time.perf_counter()
+app.jinja_env.cache.clear()
+with app.test_client() as client:
+    client.get("/menu")
+    with client.session_transaction() as session:
+        session["admin"] = True
+    client.get("/admin-events")
+rendered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "load_templates_ms": (compiled - created) * 1000,
+    "first_renders_ms": (rendered - compiled) * 1000,
+}))
+"""
+
+
+def probe(workdir, jinja_cache_dir):
+    env = {
+        **os.environ,
+        "FLASK_SECRET_KEY": "startup",
+        "ADMIN_PASSWORD": "startup",
+        "PYTHONPATH": ROOT,
+        "JINJA_CACHE_DIR": jinja_cache_dir,
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "RATELIMIT_STORAGE_URI": "memory://",
+    }
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker cold-start timings with and without the Jinja bytecode cache.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_dir = os.path.join(workdir, "jinja_cache")
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "app", "precompile-templates"],
+            cwd=ROOT,
+            env={**os.environ, "FLASK_SECRET_KEY": "startup", "ADMIN_PASSWORD": "startup", "JINJA_CACHE_DIR": cache_dir,
+                 "METRICS_DIR": os.path.join(workdir, "metrics"), "RATELIMIT_STORAGE_URI": "memory://"},
+            check=True,
+        )
+        modes = {"no bytecode cache": "", "bytecode cache": cache_dir}
+        print(f"{'mode':<20} {'import':>8} {'create':>8} {'templates':>10} {'1st render':>11}  (median ms of {args.runs})")
+        for mode, directory in modes.items():
+            runs = [probe(workdir, directory) for _ in range(args.runs)]
+            medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(
+                f"{mode:<20} {medians['import_ms']:>8.1f} {medians['create_app_ms']:>8.1f}"
+                f" {medians['load_templates_ms']:>10.1f} {medians['first_renders_ms']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
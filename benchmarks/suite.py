@@ -0,0 +1,193 @@
+"""Benchmark the JSON persistence helpers, validation and full requests at scaled sizes.
+
+    python benchmarks/suite.py run [--quick] [--output results.json]
+                                   [--compare baseline.json] [--threshold 0.2]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.2]
+
+`run` writes median/p95 timings as JSON. `compare` (or `run --compare`) exits with
+status 1 when a benchmark's median got slower than the baseline by more than
+`--threshold` (a fraction, 0.2 = 20%) and by at least `--min-delta-ms`.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+if __package__:
+    from .datasets import EVENT_SIZES, MENU_SIZES, make_events, make_menu, make_text
+else:  # run as a script
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from datasets import EVENT_SIZES, MENU_SIZES, make_events, make_menu, make_text
+
+QUICK_EVENT_SIZES = (10, 1_000)
+QUICK_MENU_SIZES = (10, 1_000)
+
+
+def measure(fn, min_time=0.5, min_iterations=3, max_iterations=1000):
+    """Call `fn` repeatedly (after one warm-up call) and summarize the per-call times in ms."""
+    fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_iterations or (time.perf_counter() - started < min_time and len(samples) < max_iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+        "iterations": len(samples),
+    }
+
+
+def _make_app(workdir):
+    os.environ.setdefault("FLASK_SECRET_KEY", "benchmark")
+    os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+    os.environ["CONTENT_STORE"] = "json"
+    os.environ["RATELIMIT_STORAGE_URI"] = "memory://"
+    os.environ["METRICS_DIR"] = os.path.join(workdir, "metrics")
+    os.environ["JINJA_CACHE_DIR"] = os.path.join(workdir, "jinja_cache")
+    os.environ["PROFILE_MODE"] = "off"
+
+    from taps_and_takeout import create_app
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, RATELIMIT_ENABLED=False)
+    # Keep access and admin log lines out of the benchmark output.
+    logging.getLogger("taps_and_takeout").setLevel(logging.WARNING)
+    client = app.test_client()
+    client.post("/admin", data={"username": "admin", "password": os.environ["ADMIN_PASSWORD"]})
+    return app, client
+
+
+def _route(app, client, path, cached=True):
+    def request():
+        if not cached:
+            app.extensions["page_cache"].clear()
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    return request
+
+
+def run(event_sizes, menu_sizes, min_time):
+    import events
+    import menu_data
+    from taps_and_takeout.validation import sanitize_text
+
+    results = {}
+
+    def bench(name, fn):
+        results[name] = measure(fn, min_time=min_time)
+        print(f"{name:<44} {results[name]['median_ms']:>10.3f} ms  (p95 {results[name]['p95_ms']:.3f}, n={results[name]['iterations']})")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        events.EVENTS_FILE = os.path.join(workdir, "events.json")
+        menu_data.MENU_FILE = os.path.join(workdir, "menu.json")
+        app, client = _make_app(workdir)
+
+        for length in (80, 400):
+            text = make_text(length)
+            bench(f"sanitize_text[chars={length}]", lambda: sanitize_text(text, allow_newlines=True))
+
+        menu_data.save_menu(make_menu(50))
+        for size in event_sizes:
+            data = make_events(size)
+            bench(f"save_events[n={size}]", lambda: events.save_events(data))
+            bench(f"load_events[n={size}]", events.load_events)
+            for path, cached in (("/events", True), ("/events", False), ("/healthz", True), ("/admin-events", True)):
+                label = path if cached else f"{path} uncached"
+                bench(f"GET {label}[events={size}]", _route(app, client, path, cached))
+
+        events.save_events(make_events(50))
+        for size in menu_sizes:
+            data = make_menu(size)
+            bench(f"save_menu[items={size}]", lambda: menu_data.save_menu(data))
+            bench(f"load_menu[items={size}]", menu_data.load_menu)
+            for path, cached in (("/menu", True), ("/menu", False), ("/admin-menu", True)):
+                label = path if cached else f"{path} uncached"
+                bench(f"GET {label}[items={size}]", _route(app, client, path, cached))
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "event_sizes": list(event_sizes),
+            "menu_sizes": list(menu_sizes),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Print a comparison table and return the names of benchmarks that regressed."""
+    regressions = []
+    print(f"{'benchmark':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        regressed = change > threshold and result["median_ms"] - before["median_ms"] >= min_delta_ms
+        if regressed:
+            regressions.append(name)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<44} {before['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite for the store, validation and routes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--quick", action="store_true", help="small sizes and short timings (smoke test)")
+    run_parser.add_argument("--events", type=int, nargs="+", help=f"event counts (default {EVENT_SIZES})")
+    run_parser.add_argument("--menu-items", type=int, nargs="+", help=f"menu item counts (default {MENU_SIZES})")
+    run_parser.add_argument("--min-time", type=float, help="seconds to spend per benchmark (default 0.5)")
+    run_parser.add_argument("--output", help="write results JSON here")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline results file")
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction (default 0.2)")
+        sub.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        baseline, current = _load(args.baseline), _load(args.current)
+    else:
+        event_sizes = args.events or (QUICK_EVENT_SIZES if args.quick else EVENT_SIZES)
+        menu_sizes = args.menu_items or (QUICK_MENU_SIZES if args.quick else MENU_SIZES)
+        min_time = args.min_time if args.min_time is not None else (0.05 if args.quick else 0.5)
+        current = run(event_sizes, menu_sizes, min_time)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+        if not args.compare:
+            return 0
+        baseline = _load(args.compare)
+
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,6 +33,8 @@ def save_events(events):
             ev["date"] = ev["date"].isoformat()
         serializable_events.append(ev)
 
-    # 3. Write the JSON file
-    with open(EVENTS_FILE, "w") as f:
+    # 3. Write a temp file and swap it in, so a crash never leaves a truncated file
+    tmp_path = f"{EVENTS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(serializable_events, f, indent=2)
+    os.replace(tmp_path, EVENTS_FILE)
@@ -0,0 +1,52 @@
+"""Production gunicorn settings (gunicorn loads ./gunicorn.conf.py automatically).
+
+Every value can be overridden with the environment variable named next to it.
+"""
+import gc
+import multiprocessing
+import os
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+# Threads overlap the small amount of file/SQLite I/O per request; a couple of
+# processes per core covers the GIL. Use benchmarks/loadtest.py --sweep to retune.
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# gthread, plus an X-Request-Start stamp so the app can shed requests that sat too
+# long in the worker's thread-pool queue (ADMISSION_MAX_QUEUE_TIME).
+worker_class = "taps_and_takeout.workers.QueueTimedThreadWorker"
+
+# Build the app (store, asset manifest, image index) once in the master.
+preload_app = True
+
+# Recycle workers now and then to cap slow leaks; the jitter keeps them from all
+# restarting at the same moment.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+
+def when_ready(server):
+    # Runs in the master after preloading and before any worker is forked.
+    if server.cfg.preload_app:
+        from taps_and_takeout import warm_up
+
+        warm_up(server.app.wsgi())
+        # Keep the warmed objects out of later GC passes so forked workers share their pages.
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from taps_and_takeout import warm_up
+
+        warm_up(worker.wsgi)
+    # Size admission from the threads this worker really runs (--threads beats the
+    # value above), unless ADMISSION_MAX_IN_FLIGHT is set explicitly.
+    if "ADMISSION_MAX_IN_FLIGHT" not in os.environ:
+        from taps_and_takeout.admission import fit_to_threads
+
+        fit_to_threads(worker.wsgi.extensions["admission"], worker.cfg.threads)
@@ -35,5 +35,7 @@ def save_menu(menu):
     directory = os.path.dirname(MENU_FILE)
     if directory and not os.path.exists(directory):
         os.makedirs(directory, exist_ok=True)
-    with open(MENU_FILE, "w") as f:
+    tmp_path = f"{MENU_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(menu, f, indent=2)
+    os.replace(tmp_path, MENU_FILE)
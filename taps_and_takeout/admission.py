@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_QUEUED = 16
+DEFAULT_QUEUE_TIMEOUT = 0.5
+DEFAULT_RETRY_AFTER = 2
+DEFAULT_MAX_QUEUE_TIME = 1.0
+GATED_BLUEPRINTS = ("public", "api")
+EXEMPT_ENDPOINTS = ("public.healthz",)
+
+
+class AdmissionController:
+    """Bounded in-flight request count with a short, bounded wait queue.
+
+    A request beyond `max_in_flight` waits up to `queue_timeout` seconds for a slot; once
+    `max_queued` requests are already waiting, further ones are shed immediately. Shedding
+    early keeps the admitted requests fast instead of slowing every request down together.
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_queued=DEFAULT_MAX_QUEUED, queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.late = 0
+
+    def acquire(self):
+        """Take a slot, waiting briefly if needed; False means the request should be shed."""
+        with self._condition:
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_queued:
+                    self.shed += 1
+                    return False
+                self.waiting += 1
+                self.queued += 1
+                try:
+                    has_slot = self._condition.wait_for(lambda: self.in_flight < self.max_in_flight, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not has_slot:
+                    self.shed += 1
+                    return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def shed_late(self):
+        """Count a request shed before asking for a slot because it already queued too long upstream."""
+        with self._condition:
+            self.late += 1
+            self.shed += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "late": self.late,
+            }
+
+
+def fit_to_threads(controller, threads):
+    """Admit one request fewer than the worker's `threads` (at least one).
+
+    The spare thread can then always queue briefly or answer 503, instead of requests
+    piling up unseen in the server's own queue behind busy threads.
+    """
+    controller.max_in_flight = max(1, threads - 1)
+
+
+def queue_time(header, now):
+    """Seconds a request waited before reaching the app, from its `X-Request-Start` header.
+
+    Takes `t=<ms>` (the QueueTimedThreadWorker, Heroku), `t=<seconds.fraction>` (nginx) or
+    microseconds; the unit is told apart by magnitude. None when the header is unusable.
+    """
+    try:
+        start = float(header.removeprefix("t="))
+    except ValueError:
+        return None
+    if start > 1e14:
+        start /= 1e6
+    elif start > 1e11:
+        start /= 1e3
+    waited = now - start
+    return waited if waited >= 0 else 0.0
+
+
+def init_admission(app):
+    """Gate public and API routes (except /healthz) behind a per-worker AdmissionController.
+
+    Requests that already waited longer than ADMISSION_MAX_QUEUE_TIME seconds before
+    reaching the app (per `X-Request-Start`; 0 disables) are shed without taking a slot.
+    Register it before other request hooks so shed requests do no further work.
+    """
+    app.config.setdefault("ADMISSION_MAX_IN_FLIGHT", int(os.getenv("ADMISSION_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)))
+    app.config.setdefault("ADMISSION_MAX_QUEUED", int(os.getenv("ADMISSION_MAX_QUEUED", DEFAULT_MAX_QUEUED)))
+    app.config.setdefault("ADMISSION_QUEUE_TIMEOUT", float(os.getenv("ADMISSION_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT)))
+    app.config.setdefault("ADMISSION_RETRY_AFTER", int(os.getenv("ADMISSION_RETRY_AFTER", DEFAULT_RETRY_AFTER)))
+    app.config.setdefault("ADMISSION_MAX_QUEUE_TIME", float(os.getenv("ADMISSION_MAX_QUEUE_TIME", DEFAULT_MAX_QUEUE_TIME)))
+    controller = AdmissionController(
+        app.config["ADMISSION_MAX_IN_FLIGHT"],
+        app.config["ADMISSION_MAX_QUEUED"],
+        app.config["ADMISSION_QUEUE_TIMEOUT"],
+    )
+    app.extensions["admission"] = controller
+    if "metrics" in app.extensions:
+        app.extensions["metrics"].add_collector(
+            lambda: {
+                "admission_queued_total": controller.queued,
+                "admission_shed_total": controller.shed,
+                "admission_shed_late_total": controller.late,
+            }
+        )
+
+    def busy():
+        return current_app.response_class(
+            "The site is busy right now, please try again in a moment.\n",
+            status=503,
+            mimetype="text/plain",
+            headers={"Retry-After": str(app.config["ADMISSION_RETRY_AFTER"])},
+        )
+
+    @app.before_request
+    def admit_request():
+        if request.blueprint not in GATED_BLUEPRINTS or request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        max_queue_time = app.config["ADMISSION_MAX_QUEUE_TIME"]
+        started = request.headers.get("X-Request-Start")
+        if max_queue_time and started:
+            waited = queue_time(started, time.time())
+            if waited is not None and waited > max_queue_time:
+                controller.shed_late()
+                return busy()
+        if not controller.acquire():
+            return busy()
+        g.admitted = True
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        if g.pop("admitted", False):
+            controller.release()
+
+    return controller
@@ -1,24 +1,33 @@
-import logging
 import os
-from datetime import timedelta
+from datetime import date, timedelta
 
 from dotenv import load_dotenv
 from flask import Flask
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
+from jinja2 import FileSystemBytecodeCache
 
+from .admission import init_admission
+from .assets import init_assets
+from .cli import register_commands
+from .compression import init_compression
+from .images import init_images
+from .logging_utils import init_logging
+from .metrics import init_metrics
+from .page_cache import PageCache
+from .profiling import init_profiling
+from .rate_limit import DEFAULT_STORAGE_URI
 from .routes.admin import admin_bp
+from .routes.api import api_bp
 from .routes.public import public_bp
+from .search import SearchIndex
 from .storage import create_store
 
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
+DEFAULT_JINJA_CACHE_DIR = os.path.join("data", "jinja_cache")
 
 
 def require_env(name):
@@ -29,7 +38,7 @@ def require_env(name):
 
 
 csrf = CSRFProtect()
-limiter = Limiter(key_func=get_remote_address, default_limits=[], storage_uri="memory://")
+limiter = Limiter(key_func=get_remote_address, default_limits=[])
 
 
 def create_app():
@@ -40,15 +49,56 @@ def create_app():
         static_folder=os.path.join(root_dir, "static"),
         static_url_path="/static",
     )
+    # Compiled template bytecode survives restarts, so new workers skip parsing templates.
+    # Must be set before anything touches app.jinja_env. JINJA_CACHE_DIR="" turns it off.
+    jinja_cache_dir = os.getenv("JINJA_CACHE_DIR", DEFAULT_JINJA_CACHE_DIR)
+    if jinja_cache_dir:
+        os.makedirs(jinja_cache_dir, exist_ok=True)
+        app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(jinja_cache_dir)}
     app.secret_key = require_env("FLASK_SECRET_KEY")
     app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=8)
+    # Counters must be shared by all gunicorn workers, or each one allows the full limit.
+    app.config["RATELIMIT_STORAGE_URI"] = os.getenv("RATELIMIT_STORAGE_URI", DEFAULT_STORAGE_URI)
     app.extensions["content_store"] = create_store()
+    app.extensions["page_cache"] = PageCache()
+    app.extensions["api_cache"] = PageCache(max_entries=256)
+    app.extensions["search_index"] = SearchIndex(app.extensions["content_store"])
 
+    init_metrics(app)
+    init_logging(app)
+    init_admission(app)
+    init_profiling(app)
+    init_assets(app)
+    init_images(app)
+    init_compression(app)
     csrf.init_app(app)
     limiter.init_app(app)
 
     app.register_blueprint(public_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
+    register_commands(app)
     limiter.limit("10 per minute", exempt_when=lambda: app.config.get("TESTING", False))(app.view_functions["admin.admin_login"])
 
     return app
+
+
+def warm_up(app):
+    """Fill the caches a first request would otherwise pay for.
+
+    Parses content into the store cache, builds the search index, compiles every template
+    and renders the public pages into the page cache. Under gunicorn's preload_app this runs once in the master,
+    and forked workers inherit the warm caches.
+    """
+    store = app.extensions["content_store"]
+    store.get_events()
+    store.get_menu()
+    store.get_upcoming_events(date.today() - timedelta(days=1))
+    app.extensions["search_index"].refresh()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    with app.test_client() as client:
+        for path in ("/", "/menu", "/events", "/contact"):
+            client.get(path)
+    # Let the log writer drain so no half-written batch is copied into the workers.
+    app.extensions["log_handler"].flush()
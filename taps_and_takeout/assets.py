@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only .gz siblings are built.
+    brotli = None
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".html", ".json", ".txt", ".xml", ".ico")
+# Preferred first when the client accepts both at the same quality.
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _static_files(static_folder):
+    for directory, _, filenames in os.walk(static_folder):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, static_folder).replace(os.sep, "/"), path
+
+
+def _is_encoded_sibling(name):
+    return name.endswith(tuple(suffix for _, suffix in ENCODING_SUFFIXES))
+
+
+def build_manifest(static_folder):
+    """Map every file under `static_folder` (as a URL path) to a short content hash."""
+    manifest = {}
+    for name, path in _static_files(static_folder):
+        if _is_encoded_sibling(name):
+            continue
+        with open(path, "rb") as f:
+            manifest[name] = hashlib.file_digest(f, "sha256").hexdigest()[:12]
+    return manifest
+
+
+def find_precompressed(static_folder):
+    """Map each static file to the encodings that have a precompressed sibling on disk.
+
+    Like compress_static, a sibling only counts if it is at least as new as its source,
+    so an edited file is never answered with its stale compressed copy.
+    """
+    mtimes = {name: os.path.getmtime(path) for name, path in _static_files(static_folder)}
+    available = {}
+    for name, mtime in mtimes.items():
+        encodings = [encoding for encoding, suffix in ENCODING_SUFFIXES if mtimes.get(name + suffix, -1) >= mtime]
+        if encodings:
+            available[name] = encodings
+    return available
+
+
+def compress_static(static_folder):
+    """Write .br (if Brotli is installed) and .gz siblings for compressible static files.
+
+    Siblings newer than their source are kept; ones that would not be smaller are skipped.
+    Returns the number of files written.
+    """
+    encoders = [("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(("br", ".br", lambda data: brotli.compress(data, quality=11)))
+    written = 0
+    for name, path in list(_static_files(static_folder)):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        for _, suffix, encode in encoders:
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            encoded = encode(data)
+            if len(encoded) >= len(data):
+                continue
+            with open(target, "wb") as f:
+                f.write(encoded)
+            written += 1
+    return written
+
+
+def choose_encoding(accept_encodings, available):
+    """Pick the best of `available` encodings the client accepts, or None for identity."""
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def asset_url(filename):
+    """URL for a static file, fingerprinted with its content hash when it is in the manifest."""
+    fingerprint = current_app.extensions["asset_manifest"].get(filename)
+    if fingerprint is None:
+        return url_for("static", filename=filename)
+    return url_for("static", filename=filename, v=fingerprint)
+
+
+def send_static(filename):
+    """Static view that serves a precompressed sibling when the client accepts one."""
+    app = current_app._get_current_object()
+    encoding = choose_encoding(request.accept_encodings, app.extensions["precompressed"].get(filename, ()))
+    if encoding is None:
+        response = app.send_static_file(filename)
+    else:
+        suffix = dict(ENCODING_SUFFIXES)[encoding]
+        response = send_from_directory(
+            app.static_folder,
+            filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=app.get_send_file_max_age(filename),
+        )
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_assets(app):
+    """Build the asset manifest, serve fingerprinted static URLs as immutable and
+    serve precompressed static files when the client accepts them."""
+    manifest = build_manifest(app.static_folder)
+    app.extensions["asset_manifest"] = manifest
+    app.extensions["precompressed"] = find_precompressed(app.static_folder)
+    app.view_functions["static"] = send_static
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        if request.endpoint == "static" and response.status_code == 200:
+            fingerprint = request.args.get("v")
+            if fingerprint and fingerprint == manifest.get(request.view_args.get("filename")):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    app.add_template_global(asset_url)
+    return manifest
@@ -0,0 +1,70 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from events import load_events
+from menu_data import load_menu
+
+from .assets import compress_static
+from .images import build_image_variants
+from .sqlite_store import SqliteContentStore
+
+
+@click.command("import-json")
+@click.option("--force", is_flag=True, help="Replace content already in the database.")
+@with_appcontext
+def import_json_command(force):
+    """Copy data/events.json and data/menu.json into the SQLite store."""
+    store = current_app.extensions["content_store"]
+    if not isinstance(store, SqliteContentStore):
+        raise click.ClickException("Set CONTENT_STORE=sqlite to import into SQLite.")
+    if not force and not store.is_empty():
+        raise click.ClickException(f"{store.path} already has content; pass --force to replace it.")
+    events = load_events()
+    menu = load_menu()
+    store.save_events(events)
+    store.save_menu(menu)
+    click.echo(f"Imported {len(events)} event(s) and {len(menu)} menu section(s) into {store.path}.")
+
+
+@click.command("build-images")
+@with_appcontext
+def build_images_command():
+    """Write resized AVIF/WebP/PNG/JPEG variants of static/images/* for picture()."""
+    try:
+        index = build_image_variants(current_app.static_folder)
+    except ImportError:
+        raise click.ClickException("Building image variants needs Pillow: pip install Pillow")
+    click.echo(f"Built variants for {len(index)} image(s) under {current_app.static_folder}/variants.")
+
+
+@click.command("compress-static")
+@with_appcontext
+def compress_static_command():
+    """Write .br/.gz siblings of compressible static files; run after build-images."""
+    written = compress_static(current_app.static_folder)
+    click.echo(f"Wrote {written} precompressed file(s) under {current_app.static_folder}.")
+
+
+@click.command("precompile-templates")
+@with_appcontext
+def precompile_templates_command():
+    """Compile every template into the Jinja bytecode cache (JINJA_CACHE_DIR); run at deploy time."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.ClickException("The Jinja bytecode cache is disabled (JINJA_CACHE_DIR is empty).")
+    started = time.perf_counter()
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    click.echo(f"Compiled {len(names)} template(s) into {env.bytecode_cache.directory} in {elapsed_ms:.1f} ms.")
+
+
+def register_commands(app):
+    app.cli.add_command(import_json_command)
+    app.cli.add_command(build_images_command)
+    app.cli.add_command(compress_static_command)
+    app.cli.add_command(precompile_templates_command)
@@ -0,0 +1,98 @@
+import gzip
+
+from flask import current_app, request, stream_with_context
+
+from .assets import brotli, choose_encoding
+
+
+DEFAULT_MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding, best=False):
+    """Encode `data`; `best` trades CPU for size and is meant for bodies that get cached."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def negotiate(size, mimetype):
+    """Encoding for a body of `size` bytes given the request's Accept-Encoding, or None to send it as is."""
+    if size < current_app.config["COMPRESS_MIN_SIZE"] or not is_compressible(mimetype):
+        return None
+    return choose_encoding(request.accept_encodings, available_encodings())
+
+
+def cached_response(cache, key, render, mimetype="text/html", stream=False):
+    """Response for a page cache entry; each encoding of an entry is compressed at most once.
+
+    With `stream`, `render` returns an iterable of str chunks. A miss then streams them
+    uncompressed and caches the joined body once the last chunk has been sent.
+    """
+    body = cache.get(key)
+    if body is None and stream:
+        response = current_app.response_class(stream_with_context(_fill(cache, key, render())), mimetype=mimetype)
+        if is_compressible(mimetype):
+            response.vary.add("Accept-Encoding")
+        return response
+    if body is None:
+        body = render().encode()
+        cache.put(key, body)
+    response = current_app.response_class(body, mimetype=mimetype)
+    encoding = negotiate(len(body), mimetype)
+    if encoding is not None:
+        encoded = cache.get(key, encoding)
+        if encoded is None:
+            encoded = compress(body, encoding, best=True)
+            cache.put(key, encoded, encoding)
+        response.set_data(encoded)
+        response.headers["Content-Encoding"] = encoding
+    if is_compressible(mimetype):
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def _fill(cache, key, chunks):
+    parts = []
+    for chunk in chunks:
+        part = chunk.encode()
+        parts.append(part)
+        yield part
+    # Only reached when the whole body was sent; a dropped connection caches nothing.
+    cache.put(key, b"".join(parts))
+
+
+def init_compression(app):
+    """Compress text responses above COMPRESS_MIN_SIZE that nothing upstream already encoded."""
+    app.config.setdefault("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not is_compressible(response.mimetype)
+        ):
+            return response
+        data = response.get_data()
+        encoding = negotiate(len(data), response.mimetype)
+        if len(data) >= app.config["COMPRESS_MIN_SIZE"]:
+            response.vary.add("Accept-Encoding")
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
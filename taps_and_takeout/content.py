@@ -0,0 +1,91 @@
+import uuid
+from datetime import date
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def find_index(rows, row_id):
+    for index, row in enumerate(rows):
+        if row.get("id") == row_id:
+            return index
+    return None
+
+
+def assign_missing_ids(rows):
+    """Give rows saved before IDs existed a positional ID that is stable until the file changes."""
+    taken = {row["id"] for row in rows if row.get("id")}
+    for index, row in enumerate(rows):
+        if row.get("id"):
+            continue
+        candidate = str(index)
+        while candidate in taken:
+            candidate += "-"
+        row["id"] = candidate
+        taken.add(candidate)
+    return rows
+
+
+def normalize_event(event):
+    event = dict(event)
+    if isinstance(event.get("date"), str):
+        event["date"] = date.fromisoformat(event["date"])
+    event["pinned"] = bool(event.get("pinned"))
+    if not event.get("recurrence"):
+        event.pop("recurrence", None)
+    return event
+
+
+def event_matches(event, text):
+    """Case-insensitive substring match on an event's title or description."""
+    needle = text.casefold()
+    return needle in event["title"].casefold() or needle in (event.get("description") or "").casefold()
+
+
+def apply_event_change(events, change):
+    """Apply one change record such as {"op": "put_event", "event": {...}}; replaying it is harmless."""
+    op = change["op"]
+    if op == "put_event":
+        event = normalize_event(change["event"])
+        index = find_index(events, event["id"])
+        if index is None:
+            events.append(event)
+        else:
+            events[index] = event
+    elif op == "delete_events":
+        doomed = set(change["ids"])
+        events[:] = [event for event in events if event.get("id") not in doomed]
+    else:
+        raise ValueError(f"Unknown event change: {op}")
+    return events
+
+
+def apply_menu_change(menu, change):
+    op = change["op"]
+    if op == "put_section":
+        section = change["section"]
+        index = find_index(menu, section["id"])
+        if index is None:
+            menu.append({"id": section["id"], "section": section["section"], "items": []})
+        else:
+            menu[index] = {**menu[index], "section": section["section"]}
+    elif op == "delete_section":
+        menu[:] = [section for section in menu if section.get("id") != change["id"]]
+    elif op in ("put_item", "delete_item"):
+        index = find_index(menu, change["section_id"])
+        if index is None:
+            return menu
+        items = menu[index]["items"]
+        if op == "put_item":
+            item = dict(change["item"])
+            item_index = find_index(items, item["id"])
+            if item_index is None:
+                items.append(item)
+            else:
+                items[item_index] = item
+        else:
+            items[:] = [item for item in items if item.get("id") != change["id"]]
+    else:
+        raise ValueError(f"Unknown menu change: {op}")
+    return menu
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from .recurrence import rule_of
+
+
+PRODID = "-//Taps & Takeout//Events//EN"
+CALENDAR_NAME = "Taps & Takeout Events"
+UID_DOMAIN = "tapsandtakeout"
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)."""
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """Split a content line into CRLF-terminated chunks of at most 75 octets, never inside a character."""
+    chunks = []
+    current, size = [], 0
+    for char in line:
+        width = len(char.encode())
+        # Continuation lines start with a space, which counts against their 75 octets.
+        if size + width > MAX_LINE_OCTETS:
+            chunks.append("".join(current))
+            current, size = [" "], 1
+        current.append(char)
+        size += width
+    chunks.append("".join(current))
+    return "\r\n".join(chunks) + "\r\n"
+
+
+def _event_lines(event, start, stamp, rule=None):
+    yield "BEGIN:VEVENT"
+    yield f"UID:event-{event['id']}@{UID_DOMAIN}"
+    yield f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}"
+    yield f"DTSTART;VALUE=DATE:{start:%Y%m%d}"
+    yield f"DTEND;VALUE=DATE:{start + timedelta(days=1):%Y%m%d}"
+    if rule is not None:
+        # Calendar clients expand the series themselves, so it is never materialized here.
+        yield f"RRULE:{rule.to_rrule()}"
+        if rule.exceptions:
+            yield "EXDATE;VALUE=DATE:" + ",".join(f"{day:%Y%m%d}" for day in rule.exceptions)
+    yield f"SUMMARY:{escape_text(event['title'])}"
+    if event.get("description"):
+        yield f"DESCRIPTION:{escape_text(event['description'])}"
+    if rule is not None:
+        yield "CATEGORIES:Recurring"
+    yield "END:VEVENT"
+
+
+def iter_calendar(pinned, events, stamp):
+    """Yield the feed one folded VEVENT at a time.
+
+    Recurring events are sent once with an RRULE. Pinned events without a schedule have
+    no date a calendar could show them on, so they are left out. `stamp` is the DTSTAMP
+    for every event; passing the content's save time keeps the bytes identical for a
+    given content version.
+    """
+    yield "".join(
+        fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{escape_text(CALENDAR_NAME)}",
+        )
+    )
+    for event in pinned:
+        rule = rule_of(event)
+        if rule is not None:
+            yield "".join(fold(line) for line in _event_lines(event, rule.first(event["date"]), stamp, rule))
+    for event in events:
+        yield "".join(fold(line) for line in _event_lines(event, event["date"], stamp))
+    yield fold("END:VCALENDAR")
@@ -0,0 +1,101 @@
+import json
+import os
+
+from flask import current_app
+from markupsafe import Markup, escape
+
+from .assets import asset_url
+
+
+VARIANT_DIR = "variants"
+VARIANT_WIDTHS = (320, 640, 960)
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Modern formats first: the browser takes the first <source> it supports.
+MODERN_FORMATS = (("avif", "image/avif", {"quality": 50}), ("webp", "image/webp", {"quality": 80, "method": 6}))
+FALLBACK_OPTIONS = {"PNG": {"optimize": True}, "JPEG": {"quality": 82, "optimize": True, "progressive": True}}
+
+
+def _variant_widths(width):
+    return [candidate for candidate in VARIANT_WIDTHS if candidate < width] + [width]
+
+
+def _is_fresh(target, source):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def build_image_variants(static_folder):
+    """Write resized AVIF/WebP/optimized variants of static/images/* under static/variants/.
+
+    Variants newer than their source are kept, so reruns only encode what changed.
+    Returns the index that picture() reads, also saved as variants/index.json.
+    """
+    from PIL import Image, features  # Only the build step needs Pillow; serving just reads index.json.
+
+    modern = [entry for entry in MODERN_FORMATS if features.check(entry[0])]
+    index = {}
+    images_folder = os.path.join(static_folder, "images")
+    for filename in sorted(os.listdir(images_folder)):
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() not in SOURCE_EXTENSIONS:
+            continue
+        source = os.path.join(images_folder, filename)
+        with Image.open(source) as original:
+            fallback_format = "PNG" if original.format == "PNG" else "JPEG"
+            outputs = [*modern, (fallback_format.lower(), "fallback", FALLBACK_OPTIONS[fallback_format])]
+            entry = {"width": original.width, "height": original.height, "sources": {}}
+            for width in _variant_widths(original.width):
+                resized = None
+                for suffix, mime, options in outputs:
+                    name = f"{VARIANT_DIR}/images/{stem}-{width}.{suffix}"
+                    target = os.path.join(static_folder, name)
+                    if not _is_fresh(target, source):
+                        if resized is None:
+                            resized = original.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+                        image = resized.convert("RGB") if suffix == "jpeg" and resized.mode != "RGB" else resized
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        image.save(target, **options)
+                    entry["sources"].setdefault(mime, []).append([width, name])
+            index[f"images/{filename}"] = entry
+    with open(os.path.join(static_folder, VARIANT_DIR, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def load_variant_index(static_folder):
+    try:
+        with open(os.path.join(static_folder, VARIANT_DIR, "index.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _srcset(candidates):
+    return ", ".join(f"{asset_url(name)} {width}w" for width, name in candidates)
+
+
+def picture(src, alt, sizes="100vw", lazy=True, **attributes):
+    """<picture> with AVIF/WebP/fallback srcsets for a static image, or a plain <img> if it has no variants."""
+    entry = current_app.extensions["image_variants"].get(src)
+    img_attributes = {"alt": alt, **attributes, "decoding": "async"}
+    if lazy:
+        img_attributes["loading"] = "lazy"
+    if entry is None:
+        return Markup(f'<img src="{escape(asset_url(src))}"{_attributes(img_attributes)}>')
+
+    fallback = entry["sources"]["fallback"]
+    img_attributes.update(width=entry["width"], height=entry["height"], srcset=_srcset(fallback), sizes=sizes)
+    sources = "".join(
+        f'<source type="{mime}" srcset="{escape(_srcset(candidates))}" sizes="{escape(sizes)}">'
+        for mime, candidates in entry["sources"].items()
+        if mime != "fallback"
+    )
+    return Markup(f'<picture>{sources}<img src="{escape(asset_url(fallback[-1][1]))}"{_attributes(img_attributes)}></picture>')
+
+
+def _attributes(attributes):
+    return "".join(f' {name.rstrip("_").replace("_", "-")}="{escape(value)}"' for name, value in attributes.items())
+
+
+def init_images(app):
+    app.extensions["image_variants"] = load_variant_index(app.static_folder)
+    app.add_template_global(picture)
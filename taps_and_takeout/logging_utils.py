@@ -1,13 +1,160 @@
 import json
 import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
+
+from flask import g, request
 
 
 log = logging.getLogger(__name__)
+access_log = logging.getLogger("taps_and_takeout.access")
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+DEFAULT_QUEUE_SIZE = 10000
+BATCH_SIZE = 256
+ACCESS_LOGGED_BLUEPRINTS = ("public", "api")
 
 
 def log_admin_action(action, **details):
-    log.info("admin_action %s", json.dumps({"action": action, **details}, default=str, sort_keys=True))
+    log.info("admin_action", extra={"structured": {"action": action, **details}})
 
 
 def log_validation_failure(form_name, **details):
-    log.warning("validation_failure %s", json.dumps({"form": form_name, **details}, default=str, sort_keys=True))
+    log.warning("validation_failure", extra={"structured": {"form": form_name, **details}})
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends a record's `structured` fields to its message as sorted JSON."""
+
+    def formatMessage(self, record):
+        structured = getattr(record, "structured", None)
+        if structured is not None:
+            record.message = f"{record.message} {json.dumps(structured, default=str, sort_keys=True)}"
+        return super().formatMessage(record)
+
+
+class BatchingQueueHandler(QueueHandler):
+    """Hands records to a background thread that formats and writes them in batches.
+
+    Request threads only enqueue; formatting and JSON serialization happen on the writer
+    thread. When the queue is full the record is dropped and counted instead of blocking.
+    The writer thread is started lazily and again after a fork (gunicorn workers).
+    """
+
+    def __init__(self, stream=None, maxsize=DEFAULT_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.stream = stream if stream is not None else sys.stderr
+        self.dropped = 0
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Unlike the stock QueueHandler, leave formatting to the writer thread.
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._start_lock:
+                self.dropped += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's writer thread is gone and its queue may be mid-use.
+            self.queue = queue.Queue(self.queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._write_batches, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _write_batches(self):
+        records_queue = self.queue
+        running = True
+        while running:
+            batch = [records_queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(records_queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is None:
+                    running = False
+                    continue
+                try:
+                    lines.append(self.format(record) + "\n")
+                except Exception:
+                    self.handleError(record)
+            try:
+                self.stream.write("".join(lines))
+                self.stream.flush()
+            except Exception:
+                pass
+            for _ in batch:
+                records_queue.task_done()
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self.queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self.queue.put(None)
+            self._thread.join(timeout=2)
+        super().close()
+
+
+def setup_logging(level=logging.INFO, stream=None):
+    """Route root logging through a BatchingQueueHandler; safe to call more than once."""
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, BatchingQueueHandler):
+            return handler
+    handler = BatchingQueueHandler(stream)
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def init_logging(app):
+    """Queue-based logging for the process plus access logs for public and API routes."""
+    handler = setup_logging()
+    app.extensions["log_handler"] = handler
+    if "metrics" in app.extensions:
+        app.extensions["metrics"].add_collector(lambda: {"log_records_dropped_total": handler.dropped})
+
+    @app.before_request
+    def start_access_timer():
+        g.access_started = time.perf_counter()
+
+    @app.after_request
+    def log_access(response):
+        if request.blueprint in ACCESS_LOGGED_BLUEPRINTS:
+            started = g.get("access_started")
+            access_log.info(
+                "access",
+                extra={
+                    "structured": {
+                        "method": request.method,
+                        "path": request.path,
+                        "status": response.status_code,
+                        "duration_ms": None if started is None else round((time.perf_counter() - started) * 1000, 2),
+                        "remote_addr": request.remote_addr,
+                    }
+                },
+            )
+        return response
+
+    return handler
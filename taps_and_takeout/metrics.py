@@ -0,0 +1,323 @@
+import atexit
+import functools
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import abort, current_app, g, has_request_context, request, session
+from flask.signals import before_render_template, template_rendered
+
+from .storage import _file_lock
+
+
+DEFAULT_METRICS_DIR = os.path.join("data", "metrics")
+FLUSH_INTERVAL = 1.0
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RETIRED_FILE = "retired.json"
+
+# Timed phase -> (histogram name, label name, help text).
+PHASES = {
+    "total": ("http_request_duration_seconds", "endpoint", "Request latency by endpoint."),
+    "store_load": ("store_operation_duration_seconds", "operation", "Content store call latency by operation."),
+    "store_save": ("store_operation_duration_seconds", "operation", "Content store call latency by operation."),
+    "validate": ("validation_duration_seconds", "form", "Form validation latency by form."),
+    "render": ("template_render_duration_seconds", "template", "Jinja render latency by template."),
+}
+STORE_READS = frozenset(
+    {"get_events", "get_upcoming_events", "query_events", "get_menu", "version", "last_modified", "cache_stats", "is_empty"}
+)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(into, snapshot):
+    for metric, label, counts, total in snapshot.get("histograms", []):
+        entry = into["histograms"].setdefault((metric, label), [[0] * (len(BUCKETS) + 1), 0.0])
+        entry[0] = [a + b for a, b in zip(entry[0], counts)]
+        entry[1] += total
+    for name, value in snapshot.get("counters", {}).items():
+        into["counters"][name] = into["counters"].get(name, 0) + value
+    return into
+
+
+def _serializable(merged):
+    return {
+        "histograms": [[metric, label, counts, total] for (metric, label), (counts, total) in merged["histograms"].items()],
+        "counters": merged["counters"],
+    }
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_snapshot(path, snapshot):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Latency histograms and counters for this worker process.
+
+    Each worker periodically writes its totals to `<directory>/<pid>.json`; /metrics sums
+    every file, so the numbers cover all gunicorn workers. Files left by exited workers
+    are folded into `retired.json` so their counts survive worker recycling. Once
+    start_flusher() is called, a background thread does the periodic writes, so request
+    threads never touch the disk; it is started again after a fork.
+    """
+
+    def __init__(self, directory=DEFAULT_METRICS_DIR):
+        self.directory = directory
+        self._collectors = []
+        self._flusher_pid = None
+        self._after_fork()
+        self._reset()
+        atexit.register(self.flush, force=True)
+        if hasattr(os, "register_at_fork"):
+            # A lock held by the parent's flusher at fork time would never be released in the child.
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._histograms = {}
+        self._observed = 0
+        self._last_flush = 0.0
+
+    def add_collector(self, collect):
+        """Register a callable returning {counter name: cumulative value} for this process."""
+        self._collectors.append(collect)
+
+    def observe(self, metric, label, seconds):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()  # forked from a preloaded parent: start from zero
+            entry = self._histograms.setdefault((metric, label), [[0] * (len(BUCKETS) + 1), 0.0])
+            entry[0][bisect_left(BUCKETS, seconds)] += 1
+            entry[1] += seconds
+            self._observed += 1
+
+    @contextmanager
+    def timed(self, phase, label):
+        """Time a block into the `phase` histogram and, inside a request, its Server-Timing total."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(PHASES[phase][0], label, elapsed)
+            if has_request_context():
+                timings = g.setdefault("server_timing", {})
+                timings[phase] = timings.get(phase, 0.0) + elapsed
+
+    def snapshot(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            merged = {"histograms": {key: [list(counts), total] for key, (counts, total) in self._histograms.items()}, "counters": {}}
+        for collect in self._collectors:
+            for name, value in collect().items():
+                merged["counters"][name] = merged["counters"].get(name, 0) + value
+        return _serializable(merged)
+
+    def _own_path(self):
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def flush(self, force=False):
+        """Write this process's totals, at most once per FLUSH_INTERVAL unless forced."""
+        with self._flush_lock:
+            now = time.monotonic()
+            if not force and now - self._last_flush < FLUSH_INTERVAL:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            if self._last_flush == 0.0:
+                # A file under our pid left by an earlier process must not be overwritten.
+                self._retire(self._own_path())
+            self._last_flush = now
+            _write_snapshot(self._own_path(), self.snapshot())
+
+    def start_flusher(self):
+        """Flush every FLUSH_INTERVAL from a daemon thread in this process; cheap to call per request."""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_periodically, name="metrics-flusher", daemon=True).start()
+
+    def _flush_periodically(self):
+        flushed = None
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            # Skip the write while nothing was observed, e.g. in an idle preloading master.
+            if self._observed == flushed:
+                continue
+            flushed = self._observed
+            try:
+                self.flush(force=True)
+            except OSError:
+                pass
+
+    def _retire(self, path):
+        if not os.path.exists(path):
+            return
+        with _file_lock(os.path.join(self.directory, RETIRED_FILE)):
+            if not os.path.exists(path):
+                return
+            retired_path = os.path.join(self.directory, RETIRED_FILE)
+            merged = _merge({"histograms": {}, "counters": {}}, _read_snapshot(retired_path))
+            _merge(merged, _read_snapshot(path))
+            _write_snapshot(retired_path, _serializable(merged))
+            os.unlink(path)
+
+    def collect(self):
+        """Totals summed over every worker, live and retired."""
+        self.flush(force=True)
+        merged = {"histograms": {}, "counters": {}}
+        for path in glob.glob(os.path.join(self.directory, "[0-9]*.json")):
+            if not _pid_alive(int(os.path.basename(path)[: -len(".json")])):
+                self._retire(path)
+                continue
+            _merge(merged, _read_snapshot(path))
+        return _merge(merged, _read_snapshot(os.path.join(self.directory, RETIRED_FILE)))
+
+    def render(self):
+        """Prometheus text exposition of collect()."""
+        merged = self.collect()
+        lines = []
+        helps = {metric: (label_name, help_text) for metric, label_name, help_text in PHASES.values()}
+        for metric in sorted({metric for metric, _ in merged["histograms"]}):
+            label_name, help_text = helps.get(metric, ("label", ""))
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (name, label), (counts, total) in sorted(merged["histograms"].items()):
+                if name != metric:
+                    continue
+                labels = f'{label_name}="{_escape(label)}"'
+                cumulative = 0
+                for bound, count in zip((*BUCKETS, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {total}")
+                lines.append(f"{metric}_count{{{labels}}} {cumulative}")
+        for name, value in sorted(merged["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def timed(phase, label):
+    return current_app.extensions["metrics"].timed(phase, label)
+
+
+def instrument_store(store, registry):
+    """Time the store's public methods as store_load / store_save.
+
+    Only the outermost call is timed, so a write that reads first is not counted twice.
+    """
+    depth = threading.local()
+
+    def wrap(name, method):
+        phase = "store_load" if name in STORE_READS else "store_save"
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            if getattr(depth, "active", False):
+                return method(*args, **kwargs)
+            depth.active = True
+            try:
+                with registry.timed(phase, name):
+                    return method(*args, **kwargs)
+            finally:
+                depth.active = False
+
+        return timed_method
+
+    for name in dir(store):
+        if not name.startswith("_") and callable(getattr(store, name)):
+            setattr(store, name, wrap(name, getattr(store, name)))
+    return store
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in timings.items())
+
+
+def init_metrics(app):
+    """Time requests, store calls and template renders; serve the totals at /metrics.
+
+    Register it before other request hooks so queueing and shedding count towards `total`.
+    /metrics is only served to a logged-in admin, or with `Authorization: Bearer <token>`
+    when METRICS_TOKEN is set; everyone else gets a 404.
+    """
+    app.config.setdefault("METRICS_DIR", os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR))
+    app.config.setdefault("METRICS_TOKEN", os.getenv("METRICS_TOKEN"))
+    registry = MetricsRegistry(app.config["METRICS_DIR"])
+    app.extensions["metrics"] = registry
+    instrument_store(app.extensions["content_store"], registry)
+
+    @app.before_request
+    def start_request_timer():
+        registry.start_flusher()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_time(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        registry.observe(PHASES["total"][0], request.endpoint or "unmatched", elapsed)
+        timings = {**g.get("server_timing", {}), "total": elapsed}
+        response.headers["Server-Timing"] = server_timing_header(timings)
+        return response
+
+    def start_render_timer(sender, template, context, **extra):
+        g.setdefault("render_started", []).append(time.perf_counter())
+
+    def record_render_time(sender, template, context, **extra):
+        elapsed = time.perf_counter() - g.render_started.pop()
+        registry.observe(PHASES["render"][0], template.name or "string", elapsed)
+        timings = g.setdefault("server_timing", {})
+        timings["render"] = timings.get("render", 0.0) + elapsed
+
+    before_render_template.connect(start_render_timer, app, weak=False)
+    template_rendered.connect(record_render_time, app, weak=False)
+
+    def metrics_view():
+        token = app.config["METRICS_TOKEN"]
+        authorization = request.headers.get("Authorization", "").encode()
+        has_token = bool(token) and hmac.compare_digest(authorization, f"Bearer {token}".encode())
+        if not has_token and not session.get("admin"):
+            abort(404)
+        return app.response_class(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    return registry
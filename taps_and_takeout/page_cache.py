@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timezone
+
+from flask import current_app, request, session
+
+from .compression import cached_response
+
+
+class PageCache:
+    """Rendered response bodies keyed by endpoint, content version and any extra inputs.
+
+    Keys embed the store's content version, so a save by any worker makes old entries
+    unreachable; they then age out of the LRU. Admin writes also clear it outright.
+    Each entry can also hold compressed copies of its body, one per content encoding.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, encoding="identity"):
+        with self._lock:
+            entry = self._entries.get(key)
+            if encoding != "identity":
+                return entry and entry.get(encoding)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["identity"]
+
+    def put(self, key, body, encoding="identity"):
+        with self._lock:
+            if encoding != "identity":
+                if key in self._entries:
+                    self._entries[key][encoding] = body
+                return
+            self._entries[key] = {"identity": body}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+ENCODED_ETAG_SUFFIXES = ("-br", "-gzip")
+
+
+def not_modified_etag(request, etag, last_modified):
+    """The ETag to send with a 304 if the client already has this representation, else None.
+
+    Compressed responses carry the ETag with an encoding suffix, so those match too.
+    """
+    if request.if_none_match:
+        for candidate in (etag, *(etag + suffix for suffix in ENCODED_ETAG_SUFFIXES)):
+            if request.if_none_match.contains_weak(candidate):
+                return candidate
+        return None
+    if request.if_modified_since and last_modified is not None:
+        if last_modified.replace(microsecond=0) <= request.if_modified_since:
+            return etag
+    return None
+
+
+def set_validators(response, etag, last_modified):
+    # A strong ETag must differ between the identity and compressed bodies.
+    if response.content_encoding:
+        etag = f"{etag}-{response.content_encoding}"
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let browsers and CDNs keep a copy, but revalidate it on every use.
+    response.cache_control.no_cache = True
+    return response
+
+
+def cached_page(kind, render, day=None, params=(), mimetype="text/html", cache="page_cache", stream=False):
+    """Serve the rendered `kind` content from an app PageCache, answering revalidations with 304.
+
+    Only the store's version and save time are read up front, so a 304 or a cache hit
+    never parses content or renders anything. Responses that depend on `day` are keyed
+    by it too, and count as modified at its midnight; `params` holds any other inputs
+    (normalized query arguments, say) the body depends on. With `stream`, `render`
+    returns an iterable of str chunks that a cache miss streams to the client.
+    """
+    # Reading the session marks the response `Vary: Cookie`, so only look when there is one.
+    if request.cookies.get(current_app.session_interface.get_cookie_name(current_app)) and session.get("_flashes"):
+        return current_app.response_class(render(), mimetype=mimetype)
+    store = current_app.extensions["content_store"]
+    key = (request.endpoint, store.version(kind)) + ((day.isoformat(),) if day else ()) + tuple(params)
+    etag = ".".join(key[:3] if day else key[:2])
+    if params:
+        etag = f"{etag}.{_params_digest(params)}"
+    last_modified = store.last_modified(kind)
+    if day is not None:
+        midnight = datetime.combine(day, time.min).astimezone(timezone.utc)
+        last_modified = max(last_modified, midnight) if last_modified else midnight
+
+    matched_etag = not_modified_etag(request, etag, last_modified)
+    if matched_etag is not None:
+        return set_validators(current_app.response_class(status=304), matched_etag, last_modified)
+    response = cached_response(current_app.extensions[cache], key, render, mimetype, stream)
+    return set_validators(response, etag, last_modified)
+
+
+def _params_digest(params):
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:12]
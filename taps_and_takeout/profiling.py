@@ -0,0 +1,118 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+
+from flask import g, request, session
+
+
+DEFAULT_PROFILE_DIR = os.path.join("data", "profiles")
+DEFAULT_SAMPLE_RATE = 100
+DEFAULT_SLOW_MS = 500
+DEFAULT_KEEP = 50
+SUMMARY_LINES = 30
+PROFILE_NAME = re.compile(r"^\d+-\d+-[A-Za-z0-9_.-]+$")
+
+
+def _slug(value):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value)[:60]
+
+
+def write_profile(directory, profiler, meta, keep=DEFAULT_KEEP):
+    """Write `<name>.pstats` plus a `<name>.json` summary, then drop all but the newest `keep`."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"{int(meta['started_at'] * 1000)}-{os.getpid()}-{_slug(meta['endpoint'])}"
+    profiler.dump_stats(os.path.join(directory, name + ".pstats"))
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    tmp_path = os.path.join(directory, f"{name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({**meta, "name": name, "summary": summary.getvalue()}, f)
+    os.replace(tmp_path, os.path.join(directory, name + ".json"))
+    _rotate(directory, keep)
+    return name
+
+
+def _rotate(directory, keep):
+    # Names start with a millisecond timestamp, so they sort oldest first.
+    names = sorted(filename[: -len(".json")] for filename in os.listdir(directory) if filename.endswith(".json"))
+    for name in names[: max(len(names) - keep, 0)]:
+        for suffix in (".json", ".pstats"):
+            try:
+                os.unlink(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(directory, name):
+    if not PROFILE_NAME.match(name):
+        return None
+    try:
+        with open(os.path.join(directory, name + ".json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def list_profiles(directory):
+    """Summaries of the kept profiles, slowest first."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in os.listdir(directory):
+        if filename.endswith(".json"):
+            profile = load_profile(directory, filename[: -len(".json")])
+            if profile is not None:
+                profiles.append(profile)
+    return sorted(profiles, key=lambda profile: profile["duration_ms"], reverse=True)
+
+
+def init_profiling(app):
+    """Profile requests with cProfile and keep the results under PROFILE_DIR.
+
+    PROFILE_MODE is "off" (default), "sample" (keep one request in PROFILE_SAMPLE_RATE)
+    or "slow" (profile every request, keep those over PROFILE_SLOW_MS). A logged-in admin
+    can also profile a single request by adding `?profile=1` to it.
+    """
+    app.config.setdefault("PROFILE_MODE", os.getenv("PROFILE_MODE", "off"))
+    app.config.setdefault("PROFILE_SAMPLE_RATE", int(os.getenv("PROFILE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)))
+    app.config.setdefault("PROFILE_SLOW_MS", float(os.getenv("PROFILE_SLOW_MS", DEFAULT_SLOW_MS)))
+    app.config.setdefault("PROFILE_DIR", os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR))
+    app.config.setdefault("PROFILE_KEEP", int(os.getenv("PROFILE_KEEP", DEFAULT_KEEP)))
+
+    @app.before_request
+    def start_profiler():
+        mode = app.config["PROFILE_MODE"]
+        requested = request.args.get("profile") == "1" and session.get("admin")
+        sampled = mode == "sample" and random.randrange(app.config["PROFILE_SAMPLE_RATE"]) == 0
+        if not (requested or sampled or mode == "slow"):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already running in this thread
+            return
+        g.profile = (profiler, time.time(), time.perf_counter(), bool(requested or sampled))
+
+    @app.teardown_request
+    def save_profile(exc):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        profiler, started_at, started, keep = profile
+        profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if not keep and duration_ms < app.config["PROFILE_SLOW_MS"]:
+            return
+        meta = {
+            "started_at": started_at,
+            "duration_ms": round(duration_ms, 2),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint or "unmatched",
+        }
+        write_profile(app.config["PROFILE_DIR"], profiler, meta, app.config["PROFILE_KEEP"])
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+
+
+DEFAULT_STORAGE_URI = "sqlite:///" + os.path.join("data", "ratelimit.db")
+# Expired counters are deleted after this many increments from one process.
+PURGE_EVERY = 1000
+
+
+class SqliteRateLimitStorage(Storage):
+    """Rate-limit counters shared by every worker on the host through one SQLite file.
+
+    Registers the ``sqlite://`` scheme with `limits`, so it is selected with a storage URI
+    such as ``sqlite:///data/ratelimit.db`` (relative) or ``sqlite:////var/lib/x.db``
+    (absolute). Each increment is a single UPSERT, which SQLite applies atomically across
+    processes. Counters are disposable, so the file skips fsync. Only the fixed-window
+    strategy (Flask-Limiter's default) is supported.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = uri.split("://", 1)[1]
+        self.path = path[1:] if path.startswith("/") else path
+        self._local = threading.local()
+        self._increments = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._connection()
+        # A counter whose window has passed starts over instead of adding to the old count.
+        (value,) = conn.execute(
+            "INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, "
+            "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING value",
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        self._increments += 1
+        if self._increments % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+        return value
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def clear(self, key):
+        self._connection().execute("DELETE FROM counters WHERE key = ?", (key,))
+
+    def reset(self):
+        return self._connection().execute("DELETE FROM counters").rowcount
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1")
+        except sqlite3.Error:
+            return False
+        return True
@@ -0,0 +1,119 @@
+import heapq
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import islice
+
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+ICAL_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_INTERVAL = 12
+MAX_EXCEPTIONS = 52
+# How far ahead listings without an end date expand recurring events.
+DEFAULT_HORIZON_DAYS = 90
+# Longest window a client may ask to have expanded, which also bounds each memoized entry.
+MAX_WINDOW_DAYS = 366
+
+
+@dataclass(frozen=True)
+class WeeklyRule:
+    """Every `interval` weeks on `weekday` (0 = Monday), skipping the `exceptions` dates.
+
+    Stored on an event as `recurrence`; the event's date anchors the series, so the
+    first occurrence is the first `weekday` on or after it.
+    """
+
+    weekday: int
+    interval: int = 1
+    exceptions: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            weekday=int(data["weekday"]),
+            interval=int(data.get("interval", 1)),
+            exceptions=tuple(sorted(date.fromisoformat(day) for day in data.get("exceptions", ()))),
+        )
+
+    def to_dict(self):
+        return {
+            "freq": "weekly",
+            "weekday": self.weekday,
+            "interval": self.interval,
+            "exceptions": [day.isoformat() for day in self.exceptions],
+        }
+
+    def describe(self):
+        if self.interval == 1:
+            return f"Every {WEEKDAYS[self.weekday]}"
+        return f"Every {self.interval} weeks on {WEEKDAYS[self.weekday]}"
+
+    def to_rrule(self):
+        return f"FREQ=WEEKLY;INTERVAL={self.interval};BYDAY={ICAL_WEEKDAYS[self.weekday]}"
+
+    def first(self, anchor):
+        return anchor + timedelta(days=(self.weekday - anchor.weekday()) % 7)
+
+
+def rule_of(event):
+    """The event's WeeklyRule, or None for one-off and schedule-less pinned events."""
+    recurrence = event.get("recurrence")
+    return WeeklyRule.from_dict(recurrence) if recurrence else None
+
+
+def iter_occurrences(rule, anchor, start, end=None):
+    """Lazily yield the series' dates from `start` through `end` (None: without end)."""
+    step = timedelta(weeks=rule.interval)
+    # Stop before date arithmetic would run past date.max, whatever `end` says.
+    last = date.max - step
+    end = last if end is None else min(end, last)
+    if anchor > last:
+        return
+    day = rule.first(anchor)
+    if day < start:
+        # Jump straight to the first occurrence in the window instead of walking the series.
+        if start > last:
+            return
+        day += step * -((day - start).days // step.days)
+    skipped = set(rule.exceptions)
+    while day <= end:
+        if day not in skipped:
+            yield day
+        day += step
+
+
+@lru_cache(maxsize=1024)
+def occurrences(rule, anchor, start, end):
+    """Occurrences within a bounded window, memoized per rule, anchor and window.
+
+    Callers keep windows to MAX_WINDOW_DAYS, so each entry holds at most ~53 dates.
+    """
+    return tuple(iter_occurrences(rule, anchor, start, end))
+
+
+def next_occurrences(event, since, count=3):
+    rule = rule_of(event)
+    return list(islice(iter_occurrences(rule, event["date"], since), count)) if rule else []
+
+
+def expand(pinned, dated, start, end):
+    """Split pinned events into schedule-less ones and dated occurrences of recurring ones.
+
+    Returns (pinned events without a rule, iterator of `dated` merged by date with every
+    occurrence from `start` through `end`). Occurrences are copies of their event with
+    `date` set and a human-readable `schedule`; nothing is expanded until iterated.
+    """
+    plain, series = [], []
+    for event in pinned:
+        rule = rule_of(event)
+        if rule is None:
+            plain.append(event)
+        else:
+            series.append(_occurrence_events(event, rule, start, end))
+    return plain, heapq.merge(dated, *series, key=lambda event: event["date"])
+
+
+def _occurrence_events(event, rule, start, end):
+    schedule = rule.describe()
+    for day in occurrences(rule, event["date"], start, end):
+        yield {**event, "date": day, "schedule": schedule}
@@ -1,34 +1,100 @@
 from datetime import date, timedelta
+import math
 import os
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, send_from_directory, session, url_for
 
 from ..logging_utils import log_admin_action, log_validation_failure
+from ..metrics import timed
+from ..profiling import list_profiles, load_profile
+from ..recurrence import WEEKDAYS, next_occurrences, rule_of
 from ..validation import validate_event_form, validate_item_form, validate_section_form
 
 
 admin_bp = Blueprint("admin", __name__)
 
+ADMIN_EVENTS_PER_PAGE = 25
+LISTING_ARGS = ("from", "to", "q", "page")
+
 
 def _store():
     return current_app.extensions["content_store"]
 
 
+@admin_bp.after_request
+def _drop_cached_pages(response):
+    # Other workers notice the new content version; this just frees the stale pages here.
+    if request.method == "POST":
+        current_app.extensions["page_cache"].clear()
+        current_app.extensions["api_cache"].clear()
+    return response
+
+
 def _require_admin():
     if not session.get("admin"):
         return redirect(url_for("admin.admin_login"))
     return None
 
 
-def _render_admin_events(events, form_data=None, form_errors=None, row_form_data=None, row_errors=None, status=200):
+def _listing_args():
+    """The admin events listing's filters and page, as given in the query string."""
+    return {name: request.args[name] for name in LISTING_ARGS if request.args.get(name)}
+
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _events_listing(store):
+    """The requested page of the filtered admin events list; the store only copies that window."""
+    args = _listing_args()
+    since, until = _parse_day(args.get("from")), _parse_day(args.get("to"))
+    text = args.get("q", "").strip()[:80]
+    try:
+        page = max(int(args.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    events, total = store.query_events(since, until, text, (page - 1) * ADMIN_EVENTS_PER_PAGE, ADMIN_EVENTS_PER_PAGE)
+    pages = max(math.ceil(total / ADMIN_EVENTS_PER_PAGE), 1)
+    if page > pages:
+        # The page emptied (say, its last event was deleted); show the last one that has rows.
+        page = pages
+        events, total = store.query_events(since, until, text, (page - 1) * ADMIN_EVENTS_PER_PAGE, ADMIN_EVENTS_PER_PAGE)
+    today = date.today()
+    for event in events:
+        rule = rule_of(event)
+        if rule is not None:
+            # Only the next few dates are generated; the series itself is never expanded.
+            event["schedule"] = rule.describe()
+            event["next_dates"] = next_occurrences(event, today)
+    return {
+        "events": events,
+        "total": total,
+        "page": page,
+        "pages": pages,
+        "filters": {"from": since.isoformat() if since else "", "to": until.isoformat() if until else "", "q": text},
+        "args": args,
+    }
+
+
+def _redirect_to_listing():
+    return redirect(url_for("admin.admin_events", **_listing_args()))
+
+
+def _render_admin_events(listing, form_data=None, form_errors=None, row_form_data=None, row_errors=None, status=200):
     return (
         render_template(
             "admin_events.html",
-            events=events,
+            listing=listing,
+            events=listing["events"],
             form_data=form_data or {},
             form_errors=form_errors or {},
             row_form_data=row_form_data or {},
             row_errors=row_errors or {},
+            weekdays=WEEKDAYS,
         ),
         status,
     )
@@ -48,11 +114,18 @@ def _render_admin_menu(menu, section_form_data=None, section_form_errors=None, i
     )
 
 
-def _parse_index(value, label):
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        raise ValueError(f"Invalid {label}")
+def _event_from_form(cleaned_form):
+    return {
+        "title": cleaned_form["title"],
+        "date": cleaned_form["date"] or date.today().isoformat(),
+        "description": cleaned_form["description"],
+        "pinned": cleaned_form["pinned"],
+        "recurrence": cleaned_form["recurrence"],
+    }
+
+
+def _has_row(rows, row_id):
+    return any(row["id"] == row_id for row in rows)
 
 
 @admin_bp.route("/admin", methods=["GET", "POST"])
@@ -84,78 +157,64 @@ def admin_events():
         return auth_redirect
 
     store = _store()
-    events = store.get_events()
 
     if request.method == "POST":
         action = request.form.get("action")
-        index = request.form.get("index")
-        cleaned_form, errors = validate_event_form(
-            request.form.get("title", ""),
-            request.form.get("date", ""),
-            request.form.get("description", ""),
-            bool(request.form.get("pinned")),
-        )
+        event_id = request.form.get("id")
+        with timed("validate", "event_form"):
+            cleaned_form, errors = validate_event_form(
+                request.form.get("title", ""),
+                request.form.get("date", ""),
+                request.form.get("description", ""),
+                bool(request.form.get("pinned")),
+                request.form.get("repeat", ""),
+                request.form.get("interval", ""),
+                request.form.get("weekday", ""),
+                request.form.get("exceptions", ""),
+            )
 
         if action == "add":
             if errors:
                 log_validation_failure("event_add", errors=errors)
-                return _render_admin_events(events, form_data=cleaned_form, form_errors=errors, status=400)
-            new_event = {
-                "title": cleaned_form["title"],
-                "date": cleaned_form["date"] or date.today().isoformat(),
-                "description": cleaned_form["description"],
-                "pinned": cleaned_form["pinned"],
-            }
-            events.append(new_event)
-            store.save_events(events)
-            log_admin_action("event_added", title=new_event["title"], pinned=new_event["pinned"])
+                return _render_admin_events(_events_listing(store), form_data=cleaned_form, form_errors=errors, status=400)
+            new_event = store.add_event(_event_from_form(cleaned_form))
+            log_admin_action("event_added", event_id=new_event["id"], title=new_event["title"], pinned=new_event["pinned"])
             flash(f"Added event “{new_event['title']}”.", "success")
-            return redirect(url_for("admin.admin_events"))
-
-        if action in ("update", "delete") and index is not None:
-            try:
-                idx = _parse_index(index, "index")
-            except ValueError as exc:
-                log_validation_failure("event_row_index", error=str(exc))
-                return _render_admin_events(events, status=400, row_errors={"global": str(exc)})
-            if idx < 0 or idx >= len(events):
-                log_validation_failure("event_row_index", error="Invalid index", index=index)
-                return _render_admin_events(events, status=400, row_errors={"global": "Invalid index"})
+            return _redirect_to_listing()
 
+        if action in ("update", "delete") and event_id is not None:
             if action == "update":
                 if errors:
-                    log_validation_failure("event_update", errors=errors, index=idx)
-                    return _render_admin_events(events, row_form_data={idx: cleaned_form}, row_errors={idx: errors}, status=400)
-                old_title = events[idx]["title"]
-                events[idx] = {
-                    "title": cleaned_form["title"],
-                    "date": cleaned_form["date"] or date.today().isoformat(),
-                    "description": cleaned_form["description"],
-                    "pinned": cleaned_form["pinned"],
-                }
-                store.save_events(events)
-                log_admin_action("event_updated", old_title=old_title, title=cleaned_form["title"], pinned=cleaned_form["pinned"])
+                    listing = _events_listing(store)
+                    if not _has_row(listing["events"], event_id):
+                        log_validation_failure("event_row_id", error="Invalid event", event_id=event_id)
+                        return _render_admin_events(listing, status=400, row_errors={"global": "Invalid event"})
+                    log_validation_failure("event_update", errors=errors, event_id=event_id)
+                    return _render_admin_events(listing, row_form_data={event_id: cleaned_form}, row_errors={event_id: errors}, status=400)
+                previous = store.update_event(event_id, _event_from_form(cleaned_form))
+                if previous is None:
+                    log_validation_failure("event_row_id", error="Invalid event", event_id=event_id)
+                    return _render_admin_events(_events_listing(store), status=400, row_errors={"global": "Invalid event"})
+                log_admin_action("event_updated", event_id=event_id, old_title=previous["title"], title=cleaned_form["title"], pinned=cleaned_form["pinned"])
                 flash(f"Updated event “{cleaned_form['title']}”.", "success")
-                return redirect(url_for("admin.admin_events"))
+                return _redirect_to_listing()
 
-            deleted_title = events[idx]["title"]
-            events.pop(idx)
-            store.save_events(events)
-            log_admin_action("event_deleted", title=deleted_title)
-            flash(f"Deleted event “{deleted_title}”.", "success")
-            return redirect(url_for("admin.admin_events"))
+            deleted = store.delete_event(event_id)
+            if deleted is None:
+                log_validation_failure("event_row_id", error="Invalid event", event_id=event_id)
+                return _render_admin_events(_events_listing(store), status=400, row_errors={"global": "Invalid event"})
+            log_admin_action("event_deleted", event_id=event_id, title=deleted["title"])
+            flash(f"Deleted event “{deleted['title']}”.", "success")
+            return _redirect_to_listing()
 
         if action == "clear_past":
             yesterday = date.today() - timedelta(days=1)
-            before = len(events)
-            events = [event for event in events if event.get("pinned") or event["date"] >= yesterday]
-            store.save_events(events)
-            removed = before - len(events)
+            removed = store.clear_past_events(yesterday)
             log_admin_action("event_clear_past", removed=removed)
             flash(f"Removed {removed} past event(s).", "success")
-            return redirect(url_for("admin.admin_events"))
+            return _redirect_to_listing()
 
-    return _render_admin_events(events)
+    return _render_admin_events(_events_listing(store))
 
 
 @admin_bp.route("/admin-menu", methods=["GET", "POST"])
@@ -165,95 +224,110 @@ def admin_menu():
         return auth_redirect
 
     store = _store()
-    menu = store.get_menu()
 
     if request.method == "POST":
         action = request.form.get("action")
-        section_index = request.form.get("section_index")
-        section_form, section_errors = validate_section_form(request.form.get("section_name", ""))
-        item_form, item_errors = validate_item_form(request.form.get("item_name", ""), request.form.get("item_description", ""))
+        section_id = request.form.get("section_id")
+        with timed("validate", "menu_form"):
+            section_form, section_errors = validate_section_form(request.form.get("section_name", ""))
+            item_form, item_errors = validate_item_form(request.form.get("item_name", ""), request.form.get("item_description", ""))
+        item = {"name": item_form["item_name"], "description": item_form["item_description"]}
 
         if action == "add_section":
             if section_errors:
                 log_validation_failure("menu_add_section", errors=section_errors)
-                return _render_admin_menu(menu, section_form_data=section_form, section_form_errors=section_errors, status=400)
-            menu.append({"section": section_form["section_name"], "items": []})
-            store.save_menu(menu)
-            log_admin_action("menu_section_added", section=section_form["section_name"])
-            flash(f"Added section “{section_form['section_name']}”.", "success")
+                return _render_admin_menu(store.get_menu(), section_form_data=section_form, section_form_errors=section_errors, status=400)
+            section = store.add_section(section_form["section_name"])
+            log_admin_action("menu_section_added", section_id=section["id"], section=section["section"])
+            flash(f"Added section “{section['section']}”.", "success")
             return redirect(url_for("admin.admin_menu"))
 
-        if action == "delete_section" and section_index is not None:
-            try:
-                si = _parse_index(section_index, "section index")
-            except ValueError as exc:
-                log_validation_failure("menu_section_index", error=str(exc))
-                return _render_admin_menu(menu, status=400, section_form_errors={"global": str(exc)})
-            if si < 0 or si >= len(menu):
-                log_validation_failure("menu_section_index", error="Invalid section index", index=section_index)
-                return _render_admin_menu(menu, status=400, section_form_errors={"global": "Invalid section index"})
-            deleted_section = menu[si]["section"]
-            menu.pop(si)
-            store.save_menu(menu)
-            log_admin_action("menu_section_deleted", section=deleted_section)
-            flash(f"Deleted section “{deleted_section}”.", "success")
+        if action == "delete_section" and section_id is not None:
+            deleted = store.delete_section(section_id)
+            if deleted is None:
+                log_validation_failure("menu_section_id", error="Invalid section", section_id=section_id)
+                return _render_admin_menu(store.get_menu(), status=400, section_form_errors={"global": "Invalid section"})
+            log_admin_action("menu_section_deleted", section_id=section_id, section=deleted["section"])
+            flash(f"Deleted section “{deleted['section']}”.", "success")
             return redirect(url_for("admin.admin_menu"))
 
-        if action == "add_item" and section_index is not None:
-            try:
-                si = _parse_index(section_index, "section index")
-            except ValueError as exc:
-                log_validation_failure("menu_item_section_index", error=str(exc))
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": str(exc)})
-            if si < 0 or si >= len(menu):
-                log_validation_failure("menu_item_section_index", error="Invalid section index", index=section_index)
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": "Invalid section index"})
+        if action == "add_item" and section_id is not None:
             if item_errors:
-                log_validation_failure("menu_item_add", errors=item_errors, section=si)
-                return _render_admin_menu(menu, item_form_data={si: item_form}, item_form_errors={si: item_errors}, status=400)
-            menu[si]["items"].append({"name": item_form["item_name"], "description": item_form["item_description"]})
-            store.save_menu(menu)
-            log_admin_action("menu_item_added", section=menu[si]["section"], item=item_form["item_name"])
-            flash(f"Added item “{item_form['item_name']}” to {menu[si]['section']}.", "success")
+                menu = store.get_menu()
+                if not _has_row(menu, section_id):
+                    log_validation_failure("menu_item_section_id", error="Invalid section", section_id=section_id)
+                    return _render_admin_menu(menu, status=400, item_form_errors={"global": "Invalid section"})
+                log_validation_failure("menu_item_add", errors=item_errors, section_id=section_id)
+                return _render_admin_menu(menu, item_form_data={section_id: item_form}, item_form_errors={section_id: item_errors}, status=400)
+            section = store.add_item(section_id, item)
+            if section is None:
+                log_validation_failure("menu_item_section_id", error="Invalid section", section_id=section_id)
+                return _render_admin_menu(store.get_menu(), status=400, item_form_errors={"global": "Invalid section"})
+            log_admin_action("menu_item_added", section=section["section"], item=item["name"])
+            flash(f"Added item “{item['name']}” to {section['section']}.", "success")
             return redirect(url_for("admin.admin_menu"))
 
-        if action in ("update_item", "delete_item") and section_index is not None:
-            try:
-                si = _parse_index(section_index, "section index")
-            except ValueError as exc:
-                log_validation_failure("menu_item_section_index", error=str(exc))
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": str(exc)})
-            if si < 0 or si >= len(menu):
-                log_validation_failure("menu_item_section_index", error="Invalid section index", index=section_index)
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": "Invalid section index"})
-
-            item_index = request.form.get("item_index")
-            try:
-                ii = _parse_index(item_index, "item index")
-            except ValueError as exc:
-                log_validation_failure("menu_item_index", error=str(exc))
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": str(exc)})
-            if ii < 0 or ii >= len(menu[si]["items"]):
-                log_validation_failure("menu_item_index", error="Invalid item index", index=item_index)
-                return _render_admin_menu(menu, status=400, item_form_errors={"global": "Invalid item index"})
+        if action in ("update_item", "delete_item") and section_id is not None:
+            item_id = request.form.get("item_id")
 
             if action == "update_item":
                 if item_errors:
-                    key = f"{si}:{ii}"
-                    log_validation_failure("menu_item_update", errors=item_errors, section=si, item=ii)
+                    menu = store.get_menu()
+                    section = next((section for section in menu if section["id"] == section_id), None)
+                    if section is None or not _has_row(section["items"], item_id):
+                        log_validation_failure("menu_item_id", error="Invalid item", section_id=section_id, item_id=item_id)
+                        return _render_admin_menu(menu, status=400, item_form_errors={"global": "Invalid item"})
+                    key = f"{section_id}:{item_id}"
+                    log_validation_failure("menu_item_update", errors=item_errors, section_id=section_id, item_id=item_id)
                     return _render_admin_menu(menu, item_form_data={key: item_form}, item_form_errors={key: item_errors}, status=400)
-                old_name = menu[si]["items"][ii]["name"]
-                menu[si]["items"][ii] = {"name": item_form["item_name"], "description": item_form["item_description"]}
-                store.save_menu(menu)
-                log_admin_action("menu_item_updated", section=menu[si]["section"], old_name=old_name, item=item_form["item_name"])
-                flash(f"Updated item “{item_form['item_name']}”.", "success")
+                updated = store.update_item(section_id, item_id, item)
+                if updated is None:
+                    log_validation_failure("menu_item_id", error="Invalid item", section_id=section_id, item_id=item_id)
+                    return _render_admin_menu(store.get_menu(), status=400, item_form_errors={"global": "Invalid item"})
+                section, previous = updated
+                log_admin_action("menu_item_updated", section=section["section"], old_name=previous["name"], item=item["name"])
+                flash(f"Updated item “{item['name']}”.", "success")
                 return redirect(url_for("admin.admin_menu"))
 
-            deleted_name = menu[si]["items"][ii]["name"]
-            menu[si]["items"].pop(ii)
-            store.save_menu(menu)
-            log_admin_action("menu_item_deleted", section=menu[si]["section"], item=deleted_name)
-            flash(f"Deleted item “{deleted_name}”.", "success")
+            deleted = store.delete_item(section_id, item_id)
+            if deleted is None:
+                log_validation_failure("menu_item_id", error="Invalid item", section_id=section_id, item_id=item_id)
+                return _render_admin_menu(store.get_menu(), status=400, item_form_errors={"global": "Invalid item"})
+            section, previous = deleted
+            log_admin_action("menu_item_deleted", section=section["section"], item=previous["name"])
+            flash(f"Deleted item “{previous['name']}”.", "success")
             return redirect(url_for("admin.admin_menu"))
 
-    return _render_admin_menu(menu)
+    return _render_admin_menu(store.get_menu())
+
+
+@admin_bp.get("/admin-profiles")
+def admin_profiles():
+    auth_redirect = _require_admin()
+    if auth_redirect:
+        return auth_redirect
+    profiles = list_profiles(current_app.config["PROFILE_DIR"])
+    return render_template("admin_profiles.html", profiles=profiles, selected=None, mode=current_app.config["PROFILE_MODE"])
+
+
+@admin_bp.get("/admin-profiles/<name>")
+def admin_profile(name):
+    auth_redirect = _require_admin()
+    if auth_redirect:
+        return auth_redirect
+    selected = load_profile(current_app.config["PROFILE_DIR"], name)
+    if selected is None:
+        abort(404)
+    profiles = list_profiles(current_app.config["PROFILE_DIR"])
+    return render_template("admin_profiles.html", profiles=profiles, selected=selected, mode=current_app.config["PROFILE_MODE"])
+
+
+@admin_bp.get("/admin-profiles/<name>/download")
+def admin_profile_download(name):
+    auth_redirect = _require_admin()
+    if auth_redirect:
+        return auth_redirect
+    directory = current_app.config["PROFILE_DIR"]
+    if load_profile(directory, name) is None:
+        abort(404)
+    return send_from_directory(os.path.abspath(directory), name + ".pstats", as_attachment=True)
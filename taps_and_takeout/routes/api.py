@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+from datetime import date, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+
+from ..page_cache import cached_page
+from ..recurrence import DEFAULT_HORIZON_DAYS, MAX_WINDOW_DAYS, expand
+from .public import MAX_QUERY_LENGTH, search_content
+
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+EVENT_FIELDS = ("id", "title", "date", "description", "pinned", "recurrence")
+ITEM_FIELDS = ("id", "name", "description")
+
+
+class BadRequest(ValueError):
+    status = 400
+
+
+class StaleCursor(BadRequest):
+    status = 409
+
+
+@api_bp.errorhandler(BadRequest)
+def _bad_request(error):
+    return jsonify({"error": str(error)}), error.status
+
+
+def _store():
+    return current_app.extensions["content_store"]
+
+
+def _fields(allowed):
+    raw = request.args.get("fields")
+    if not raw:
+        return allowed
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown) or raw}. Choose from {', '.join(allowed)}.")
+    return fields
+
+
+def _limit():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest("limit must be a number.")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_LIMIT}.")
+    return limit
+
+
+def _date_arg(name, default=None):
+    raw = request.args.get(name)
+    if not raw:
+        return default
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be a YYYY-MM-DD date.")
+
+
+def _encode_cursor(version, offset):
+    return base64.urlsafe_b64encode(json.dumps([version, offset]).encode()).decode().rstrip("=")
+
+
+def _offset(kind):
+    """Offset encoded in the `cursor` argument; cursors only hold for the content version they came from."""
+    raw = request.args.get("cursor")
+    if not raw:
+        return 0
+    try:
+        version, offset = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequest("Invalid cursor.")
+    if type(offset) is not int or offset < 0:
+        raise BadRequest("Invalid cursor.")
+    if version != _store().version(kind):
+        raise StaleCursor("The content changed since this cursor was issued; start again from the first page.")
+    return offset
+
+
+def _page(kind, rows, offset, limit):
+    page = rows[offset:offset + limit]
+    next_offset = offset + limit
+    next_cursor = _encode_cursor(_store().version(kind), next_offset) if next_offset < len(rows) else None
+    return page, next_cursor
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+@api_bp.get("/events")
+def events():
+    """Pinned events first, then dated events and occurrences of recurring ones from `from` (default yesterday) to `to`, by date."""
+    today = date.today()
+    since = _date_arg("from", today - timedelta(days=1))
+    until = _date_arg("to")
+    # Recurring events become dated occurrences up to `to`, or DEFAULT_HORIZON_DAYS ahead.
+    expand_until = until or today + timedelta(days=DEFAULT_HORIZON_DAYS)
+    if (expand_until - since).days > MAX_WINDOW_DAYS:
+        raise BadRequest(f"from and to (default {DEFAULT_HORIZON_DAYS} days ahead) may be at most {MAX_WINDOW_DAYS} days apart.")
+    include_pinned = request.args.get("pinned", "1") not in ("0", "false")
+    fields, limit, offset = _fields(EVENT_FIELDS), _limit(), _offset("events")
+
+    def render():
+        pinned, upcoming = _store().get_upcoming_events(since)
+        pinned, dated = expand(pinned, upcoming, since, expand_until)
+        rows = (pinned if include_pinned else []) + [event for event in dated if until is None or event["date"] <= until]
+        page, next_cursor = _page("events", rows, offset, limit)
+        data = [
+            {field: event["date"].isoformat() if field == "date" else event.get(field) for field in fields}
+            for event in page
+        ]
+        return _dumps({"data": data, "next_cursor": next_cursor})
+
+    params = (since.isoformat(), until.isoformat() if until else "", include_pinned, fields, limit, offset)
+    # The default `from` moves at midnight, so the response depends on the day too.
+    return cached_page("events", render, day=today, params=params, mimetype="application/json", cache="api_cache")
+
+
+@api_bp.get("/menu")
+def menu():
+    """Menu sections in order, paginated by section; `fields` picks item fields."""
+    fields, limit, offset = _fields(ITEM_FIELDS), _limit(), _offset("menu")
+
+    def render():
+        page, next_cursor = _page("menu", _store().get_menu(), offset, limit)
+        data = [
+            {
+                "id": section["id"],
+                "section": section["section"],
+                "items": [{field: item.get(field) for field in fields} for item in section["items"]],
+            }
+            for section in page
+        ]
+        return _dumps({"data": data, "next_cursor": next_cursor})
+
+    return cached_page("menu", render, params=(fields, limit, offset), mimetype="application/json", cache="api_cache")
+
+
+@api_bp.get("/search")
+def search():
+    """Ranked menu items and events for `q`; words also match as prefixes, for search-as-you-type."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        raise BadRequest("q is required.")
+    if len(query) > MAX_QUERY_LENGTH:
+        raise BadRequest(f"q must be at most {MAX_QUERY_LENGTH} characters.")
+    data = []
+    for kind, result in search_content(query, _limit()):
+        if kind == "event":
+            data.append({"type": "event", **{field: result.get(field) for field in EVENT_FIELDS}, "date": result["date"].isoformat()})
+        else:
+            data.append({"type": "item", "section": result["section"], **{field: result.get(field) for field in ITEM_FIELDS}})
+    return current_app.response_class(_dumps({"data": data}), mimetype="application/json")
@@ -1,10 +1,19 @@
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 
-from flask import Blueprint, current_app, jsonify, render_template
+from flask import Blueprint, current_app, jsonify, render_template, request
+
+from ..ical import iter_calendar
+from ..page_cache import cached_page
+from ..recurrence import DEFAULT_HORIZON_DAYS, expand
+from ..search import shown_publicly
 
 
 public_bp = Blueprint("public", __name__)
 
+ICS_HISTORY_DAYS = 30
+SEARCH_LIMIT = 20
+MAX_QUERY_LENGTH = 100
+
 
 def _store():
     return current_app.extensions["content_store"]
@@ -17,19 +26,49 @@ def index():
 
 @public_bp.get("/menu")
 def menu():
-    return render_template("menu.html", menu=_store().get_menu())
+    return cached_page("menu", lambda: render_template("menu.html", menu=_store().get_menu()))
 
 
 @public_bp.get("/events")
 def events():
-    events_list = _store().get_events()
-    yesterday = date.today() - timedelta(days=1)
-    pinned = [event for event in events_list if event.get("pinned")]
-    upcoming = sorted(
-        [event for event in events_list if not event.get("pinned") and event["date"] >= yesterday],
-        key=lambda event: event["date"],
-    )
-    return render_template("events.html", pinned=pinned, events=upcoming)
+    today = date.today()
+
+    def render():
+        since = today - timedelta(days=1)
+        pinned, upcoming = _store().get_upcoming_events(since)
+        pinned, upcoming = expand(pinned, upcoming, since, today + timedelta(days=DEFAULT_HORIZON_DAYS))
+        # The template tests the list for emptiness, and the window is bounded by the horizon.
+        return render_template("events.html", pinned=pinned, events=list(upcoming))
+
+    # The "yesterday" cutoff moves at midnight, so the page depends on the day too.
+    return cached_page("events", render, day=today)
+
+
+@public_bp.get("/events.ics")
+def events_ics():
+    """Subscribable calendar feed: recurring events plus dated events from the last ICS_HISTORY_DAYS on."""
+    today = date.today()
+
+    def render():
+        store = _store()
+        pinned, upcoming = store.get_upcoming_events(today - timedelta(days=ICS_HISTORY_DAYS))
+        stamp = store.last_modified("events") or datetime.combine(today, time.min, timezone.utc)
+        return iter_calendar(pinned, upcoming, stamp.astimezone(timezone.utc))
+
+    return cached_page("events", render, day=today, mimetype="text/calendar", stream=True)
+
+
+def search_content(query, limit=SEARCH_LIMIT):
+    """Ranked matches among the menu items and the events the /events page would list."""
+    since = date.today() - timedelta(days=1)
+    return current_app.extensions["search_index"].search(query[:MAX_QUERY_LENGTH], limit, include=shown_publicly(since))
+
+
+@public_bp.get("/search")
+def search():
+    query = request.args.get("q", "").strip()
+    results = search_content(query) if query else []
+    return render_template("search.html", query=query, results=results)
 
 
 @public_bp.get("/contact")
@@ -45,5 +84,8 @@ def healthz():
             "status": "ok",
             "events_count": len(store.get_events()),
             "menu_sections": len(store.get_menu()),
+            "cache": store.cache_stats(),
+            "admission": current_app.extensions["admission"].stats(),
+            "search": current_app.extensions["search_index"].stats(),
         }
     )
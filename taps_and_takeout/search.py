@@ -0,0 +1,149 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+
+TOKEN = re.compile(r"\w+")
+TITLE_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+# A query term that only matches the start of a word counts for less than a whole word.
+PREFIX_FACTOR = 0.5
+MAX_QUERY_TERMS = 8
+
+
+def tokenize(text):
+    """Lowercased words with accents stripped, so "Café" and "cafe" match."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return TOKEN.findall("".join(char for char in folded if not unicodedata.combining(char)))
+
+
+def shown_publicly(since):
+    """`include` filter for what the public pages list: menu items, pinned events and events from `since` on."""
+    return lambda kind, result: kind == "item" or result["pinned"] or result["date"] >= since
+
+
+def _event_documents(events):
+    for event in events:
+        yield ("event", event["id"]), (event["title"], event.get("description", "")), event
+
+
+def _menu_documents(menu):
+    for section in menu:
+        for item in section["items"]:
+            result = {**item, "section": section["section"]}
+            yield ("item", section["id"], item["id"]), (item["name"], item.get("description", "")), result
+
+
+class SearchIndex:
+    """Inverted index over event titles/descriptions and menu item names/descriptions.
+
+    Each search first compares the store's content versions with the ones last indexed.
+    After a save, only the documents whose text changed are re-tokenized; the postings
+    and the sorted vocabulary used for prefix matching are updated in place.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._keys = {}
+        self._documents = {}
+        self._postings = {}
+        self._vocabulary = []
+        self.reindexed = 0
+
+    def refresh(self):
+        """Bring the index up to date with the store; a no-op unless content was saved."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        self._sync("events", lambda: _event_documents(self.store.get_events()))
+        self._sync("menu", lambda: _menu_documents(self.store.get_menu()))
+
+    def _sync(self, kind, documents):
+        version = self.store.version(kind)
+        if self._versions.get(kind) == version:
+            return
+        seen = set()
+        for key, texts, result in documents():
+            seen.add(key)
+            current = self._documents.get(key)
+            if current is not None and current[0] == texts:
+                self._documents[key] = (texts, current[1], result)
+                continue
+            if current is not None:
+                self._unindex(key, current[1])
+            weights = {}
+            for text, weight in zip(texts, (TITLE_WEIGHT, TEXT_WEIGHT)):
+                for token in tokenize(text):
+                    weights[token] = max(weights.get(token, 0.0), weight)
+            self._index(key, weights)
+            self._documents[key] = (texts, weights, result)
+            self.reindexed += 1
+        for key in self._keys.get(kind, set()) - seen:
+            self._unindex(key, self._documents.pop(key)[1])
+        self._keys[kind] = seen
+        self._versions[kind] = version
+
+    def _index(self, key, weights):
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            postings[key] = weight
+
+    def _unindex(self, key, weights):
+        for token in weights:
+            postings = self._postings[token]
+            del postings[key]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _term_scores(self, term):
+        """Best weight per document for `term`, as a whole word or as a word prefix."""
+        scores = dict(self._postings.get(term, {}))
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            token = self._vocabulary[position]
+            position += 1
+            if token == term:
+                continue
+            for key, weight in self._postings[token].items():
+                scores[key] = max(scores.get(key, 0.0), weight * PREFIX_FACTOR)
+        return scores
+
+    def search(self, query, limit=20, include=None):
+        """Documents matching every query term, best first, as ("event" or "item", result) pairs.
+
+        `include(kind, result)` can filter matches before the limit is applied.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        with self._lock:
+            self._refresh()
+            totals = None
+            for term in terms:
+                scores = self._term_scores(term)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {key: total + scores[key] for key, total in totals.items() if key in scores}
+                if not totals:
+                    return []
+            ranked = sorted(totals.items(), key=lambda entry: (-entry[1], self._documents[entry[0]][0][0].casefold()))
+            results = []
+            for key, _ in ranked:
+                result = self._documents[key][2]
+                if include is None or include(key[0], result):
+                    results.append((key[0], dict(result)))
+                    if len(results) == limit:
+                        break
+            return results
+
+    def stats(self):
+        return {"documents": len(self._documents), "tokens": len(self._postings), "reindexed": self.reindexed}
@@ -0,0 +1,327 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+
+from .content import new_id, normalize_event
+
+
+DEFAULT_DB_PATH = os.path.join("data", "content.db")
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE events (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            pinned INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX events_pinned_date ON events (pinned, date, position)",
+        """
+        CREATE TABLE menu_sections (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE menu_items (
+            id TEXT NOT NULL,
+            section_id TEXT NOT NULL REFERENCES menu_sections (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (section_id, id)
+        )
+        """,
+    ],
+    [
+        """
+        CREATE TABLE content_meta (
+            kind TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+    ],
+    [
+        # JSON-encoded recurrence rule (see recurrence.WeeklyRule.to_dict); NULL for one-off events.
+        "ALTER TABLE events ADD COLUMN recurrence TEXT",
+    ],
+]
+
+
+def _event_from_row(row):
+    event = {
+        "id": row["id"],
+        "title": row["title"],
+        "date": date.fromisoformat(row["date"]),
+        "description": row["description"],
+        "pinned": bool(row["pinned"]),
+    }
+    if row["recurrence"]:
+        event["recurrence"] = json.loads(row["recurrence"])
+    return event
+
+
+def _event_params(event):
+    event = normalize_event(event)
+    recurrence = json.dumps(event["recurrence"]) if event.get("recurrence") else None
+    return (event["title"], event["date"].isoformat(), event.get("description", ""), int(event["pinned"]), recurrence)
+
+
+def _migrate(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@dataclass
+class SqliteContentStore:
+    """SQLite-backed content store.
+
+    Runs in WAL mode so gunicorn workers keep reading while the admin writes. Connections
+    are opened lazily per thread and per process, so the store is safe to create before fork.
+    """
+
+    path: str = DEFAULT_DB_PATH
+    _local: threading.local = field(default_factory=threading.local, init=False, repr=False)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        _migrate(conn)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self, kind):
+        """Write transaction that bumps the version of `kind` ("events" or "menu") if any row changed."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        changes_before = conn.total_changes
+        try:
+            yield conn
+            if conn.total_changes != changes_before:
+                conn.execute(
+                    "INSERT INTO content_meta (kind, version, updated_at) VALUES (?, 1, ?) "
+                    "ON CONFLICT (kind) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+                    (kind, time.time()),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def version(self, kind):
+        row = self._connection().execute("SELECT version FROM content_meta WHERE kind = ?", (kind,)).fetchone()
+        return str(row["version"]) if row else "0"
+
+    def last_modified(self, kind):
+        row = self._connection().execute("SELECT updated_at FROM content_meta WHERE kind = ?", (kind,)).fetchone()
+        return datetime.fromtimestamp(row["updated_at"], timezone.utc) if row else None
+
+    def get_events(self):
+        rows = self._connection().execute("SELECT * FROM events ORDER BY position")
+        return [_event_from_row(row) for row in rows]
+
+    def get_upcoming_events(self, since):
+        conn = self._connection()
+        pinned = conn.execute("SELECT * FROM events WHERE pinned = 1 ORDER BY position")
+        upcoming = conn.execute(
+            "SELECT * FROM events WHERE pinned = 0 AND date >= ? ORDER BY date, position",
+            (since.isoformat(),),
+        )
+        return [_event_from_row(row) for row in pinned], [_event_from_row(row) for row in upcoming]
+
+    def query_events(self, since=None, until=None, text=None, offset=0, limit=None):
+        """Same contract as JsonContentStore.query_events, with the filtering and window done in SQL."""
+        clauses, params = [], []
+        if since is not None or until is not None:
+            clauses.append("pinned = 0")
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append("date <= ?")
+            params.append(until.isoformat())
+        if text:
+            # LIKE ignores case for ASCII letters only; good enough for an admin filter.
+            pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM events {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM events {where} ORDER BY pinned DESC, CASE WHEN pinned THEN '' ELSE date END, position "
+            "LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset),
+        )
+        return [_event_from_row(row) for row in rows], total
+
+    def save_events(self, events):
+        with self._write("events") as conn:
+            conn.execute("DELETE FROM events")
+            conn.executemany(
+                "INSERT INTO events (id, position, title, date, description, pinned, recurrence) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(event.get("id") or new_id(), position, *_event_params(event)) for position, event in enumerate(events)],
+            )
+
+    def add_event(self, event):
+        event = normalize_event({**event, "id": new_id()})
+        with self._write("events") as conn:
+            conn.execute(
+                "INSERT INTO events (id, position, title, date, description, pinned, recurrence) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM events), ?, ?, ?, ?, ?)",
+                (event["id"], *_event_params(event)),
+            )
+        return event
+
+    def update_event(self, event_id, fields):
+        with self._write("events") as conn:
+            row = conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+            if row is None:
+                return None
+            previous = _event_from_row(row)
+            conn.execute(
+                "UPDATE events SET title = ?, date = ?, description = ?, pinned = ?, recurrence = ? WHERE id = ?",
+                (*_event_params({**previous, **fields}), event_id),
+            )
+        return previous
+
+    def delete_event(self, event_id):
+        with self._write("events") as conn:
+            row = conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        return _event_from_row(row)
+
+    def clear_past_events(self, since):
+        with self._write("events") as conn:
+            return conn.execute("DELETE FROM events WHERE pinned = 0 AND date < ?", (since.isoformat(),)).rowcount
+
+    def get_menu(self):
+        conn = self._connection()
+        menu = []
+        sections = {}
+        for row in conn.execute("SELECT * FROM menu_sections ORDER BY position"):
+            section = {"id": row["id"], "section": row["name"], "items": []}
+            sections[row["id"]] = section
+            menu.append(section)
+        for row in conn.execute("SELECT * FROM menu_items ORDER BY section_id, position"):
+            sections[row["section_id"]]["items"].append(
+                {"id": row["id"], "name": row["name"], "description": row["description"]}
+            )
+        return menu
+
+    def save_menu(self, menu):
+        with self._write("menu") as conn:
+            conn.execute("DELETE FROM menu_items")
+            conn.execute("DELETE FROM menu_sections")
+            for position, section in enumerate(menu):
+                section_id = section.get("id") or new_id()
+                conn.execute(
+                    "INSERT INTO menu_sections (id, position, name) VALUES (?, ?, ?)",
+                    (section_id, position, section["section"]),
+                )
+                conn.executemany(
+                    "INSERT INTO menu_items (id, section_id, position, name, description) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (item.get("id") or new_id(), section_id, item_position, item["name"], item.get("description", ""))
+                        for item_position, item in enumerate(section.get("items", []))
+                    ],
+                )
+
+    def _section(self, conn, section_id):
+        row = conn.execute("SELECT * FROM menu_sections WHERE id = ?", (section_id,)).fetchone()
+        return None if row is None else {"id": row["id"], "section": row["name"]}
+
+    def _item(self, conn, section_id, item_id):
+        row = conn.execute("SELECT * FROM menu_items WHERE section_id = ? AND id = ?", (section_id, item_id)).fetchone()
+        return None if row is None else {"id": row["id"], "name": row["name"], "description": row["description"]}
+
+    def add_section(self, name):
+        section = {"id": new_id(), "section": name, "items": []}
+        with self._write("menu") as conn:
+            conn.execute(
+                "INSERT INTO menu_sections (id, position, name) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM menu_sections), ?)",
+                (section["id"], name),
+            )
+        return section
+
+    def delete_section(self, section_id):
+        with self._write("menu") as conn:
+            section = self._section(conn, section_id)
+            if section is not None:
+                conn.execute("DELETE FROM menu_sections WHERE id = ?", (section_id,))
+        return section
+
+    def add_item(self, section_id, item):
+        with self._write("menu") as conn:
+            section = self._section(conn, section_id)
+            if section is None:
+                return None
+            conn.execute(
+                "INSERT INTO menu_items (id, section_id, position, name, description) "
+                "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM menu_items WHERE section_id = ?), ?, ?)",
+                (new_id(), section_id, section_id, item["name"], item.get("description", "")),
+            )
+        return section
+
+    def update_item(self, section_id, item_id, item):
+        with self._write("menu") as conn:
+            previous = self._item(conn, section_id, item_id)
+            if previous is None:
+                return None
+            conn.execute(
+                "UPDATE menu_items SET name = ?, description = ? WHERE section_id = ? AND id = ?",
+                (item["name"], item.get("description", ""), section_id, item_id),
+            )
+            return self._section(conn, section_id), previous
+
+    def delete_item(self, section_id, item_id):
+        with self._write("menu") as conn:
+            previous = self._item(conn, section_id, item_id)
+            if previous is None:
+                return None
+            conn.execute("DELETE FROM menu_items WHERE section_id = ? AND id = ?", (section_id, item_id))
+            return self._section(conn, section_id), previous
+
+    def is_empty(self):
+        conn = self._connection()
+        return not conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() and not conn.execute(
+            "SELECT 1 FROM menu_sections LIMIT 1"
+        ).fetchone()
+
+    def cache_stats(self):
+        return {}
@@ -1,25 +1,551 @@
-from dataclasses import dataclass
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
 
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to an in-process lock.
+    fcntl = None
+
+import events as event_files
+import menu_data as menu_files
 from events import load_events, save_events
 from menu_data import load_menu, save_menu
 
+from .content import (
+    apply_event_change,
+    apply_menu_change,
+    assign_missing_ids,
+    event_matches,
+    find_index,
+    new_id,
+    normalize_event,
+)
+from .sqlite_store import DEFAULT_DB_PATH, SqliteContentStore
+from .timeline import EventTimeline
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_BYTES = 64 * 1024
+
+_fallback_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _file_inode(path):
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def _file_modified(path):
+    try:
+        return datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc)
+    except FileNotFoundError:
+        return None
+
+
+def _file_size(path):
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _version_token(*signatures):
+    return ".".join("-".join(f"{part:x}" for part in signature) if signature else "0" for signature in signatures)
+
+
+def _journal_path(path):
+    return os.path.splitext(path)[0] + ".journal"
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+@contextmanager
+def _file_lock(path):
+    """Serialize read-modify-write cycles on `path` across threads and worker processes."""
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _load_event_timeline():
+    return EventTimeline(assign_missing_ids(load_events()))
+
+
+def _load_menu_with_ids():
+    menu = assign_missing_ids(_copy_menu(load_menu()))
+    for section in menu:
+        assign_missing_ids(section["items"])
+    return menu
+
+
+def _copy_events(events):
+    return [dict(event) for event in events]
+
+
+def _copy_menu(menu):
+    return [{**section, "items": [dict(item) for item in section.get("items", [])]} for section in menu]
+
+
+class StatCache:
+    """Parsed contents of one file, re-parsed only when its inode, mtime or size changes.
+
+    `view` callbacks run under the cache lock, so they never see a half-applied change.
+    """
+
+    def __init__(self, loader, apply_change):
+        self._loader = loader
+        self._apply_change = apply_change
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, view=None):
+        key = (path, _file_signature(path))
+        with self._lock:
+            if self._key == key:
+                self.hits += 1
+            else:
+                self.misses += 1
+                # Stat before parsing: if the file changes mid-read the next call sees a new signature and re-parses.
+                self._value = self._loader()
+                self._key = key
+            return view(self._value) if view else self._value
+
+    def advance(self, path, changes):
+        """Apply changes this process just wrote to `path` instead of re-parsing the file.
+
+        Only valid while holding the file lock that covered both the read and the write.
+        """
+        with self._lock:
+            if self._key is None or self._key[0] != path:
+                return
+            for change in changes:
+                self._apply_change(self._value, change)
+            self._key = (path, _file_signature(path))
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+            self._value = None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class JournalCache:
+    """Snapshot file plus replayed journal, advanced by reading only the journal's new tail.
+
+    Has the same get/invalidate/stats interface as StatCache. A snapshot change or a new
+    journal file (after compaction) triggers a full reload.
+    """
+
+    def __init__(self, loader, apply_change):
+        self._loader = loader
+        self._apply_change = apply_change
+        self._lock = threading.Lock()
+        self._key = None
+        self._offset = 0
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+        self.tail_reads = 0
+
+    def get(self, path, view=None):
+        journal_path = _journal_path(path)
+        key = (path, _file_signature(path), _file_inode(journal_path))
+        with self._lock:
+            size = _file_size(journal_path) if self._key == key else None
+            if size == self._offset:
+                self.hits += 1
+            elif size is not None and size > self._offset and self._read_tail(journal_path, key[2]):
+                self.tail_reads += 1
+            else:
+                self.misses += 1
+                self._reload(path, journal_path)
+            return view(self._value) if view else self._value
+
+    def _replay(self, handle, value, offset):
+        handle.seek(offset)
+        data = handle.read()
+        # A record without its trailing newline is still being written (or was torn by a crash).
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply_change(value, json.loads(line))
+        return offset + end
+
+    def _read_tail(self, journal_path, inode):
+        try:
+            with open(journal_path, "rb") as handle:
+                if os.fstat(handle.fileno()).st_ino != inode:
+                    return False
+                self._offset = self._replay(handle, self._value, self._offset)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _reload(self, path, journal_path):
+        # Open the journal before reading the snapshot: if compaction swaps both in between,
+        # the old journal is replayed onto the new snapshot, which is harmless because changes are idempotent.
+        try:
+            handle = open(journal_path, "rb")
+        except FileNotFoundError:
+            handle = None
+        try:
+            signature = _file_signature(path)
+            value = self._loader()
+            inode, offset = None, 0
+            if handle is not None:
+                inode = os.fstat(handle.fileno()).st_ino
+                offset = self._replay(handle, value, 0)
+        finally:
+            if handle is not None:
+                handle.close()
+        self._key = (path, signature, inode)
+        self._offset = offset
+        self._value = value
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+            self._value = None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "tail_reads": self.tail_reads}
+
 
 @dataclass
 class JsonContentStore:
-    """JSON-backed content store that can be swapped for SQLite later."""
+    """JSON-backed content store; set CONTENT_STORE=sqlite to use SqliteContentStore instead.
+
+    Parsed files are cached in memory and reused until the file on disk changes, so
+    read-heavy public pages skip the JSON parse. Callers get copies they may mutate.
+    """
+
+    _events_cache: StatCache = field(
+        default_factory=lambda: StatCache(_load_event_timeline, EventTimeline.apply), init=False, repr=False
+    )
+    _menu_cache: StatCache = field(
+        default_factory=lambda: StatCache(_load_menu_with_ids, apply_menu_change), init=False, repr=False
+    )
+
+    def _path(self, kind):
+        return event_files.EVENTS_FILE if kind == "events" else menu_files.MENU_FILE
+
+    def version(self, kind):
+        """Token that changes whenever `kind` ("events" or "menu") is saved by any worker; costs one stat."""
+        return _version_token(_file_signature(self._path(kind)))
+
+    def last_modified(self, kind):
+        """UTC time of the last save of `kind`, or None if it was never saved."""
+        return _file_modified(self._path(kind))
+
+    def _events_view(self, view):
+        return self._events_cache.get(event_files.EVENTS_FILE, view)
 
     def get_events(self):
-        return load_events()
+        return self._events_view(lambda timeline: _copy_events(timeline.rows))
+
+    def get_upcoming_events(self, since):
+        return self._events_view(
+            lambda timeline: (_copy_events(timeline.pinned()), _copy_events(timeline.on_or_after(since)))
+        )
+
+    def query_events(self, since=None, until=None, text=None, offset=0, limit=None):
+        """One window of events for the admin list, plus the total number that match.
+
+        Pinned events come first, then dated events by date. A date range leaves pinned
+        events out; `text` matches title or description. Only the window is copied.
+        """
+
+        def view(timeline):
+            if since is None and until is None:
+                rows = timeline.pinned() + timeline.between()
+            else:
+                rows = timeline.between(since, until)
+            if text:
+                rows = [event for event in rows if event_matches(event, text)]
+            end = None if limit is None else offset + limit
+            return _copy_events(rows[offset:end]), len(rows)
+
+        return self._events_view(view)
 
     def save_events(self, events):
         save_events(events)
+        self._events_cache.invalidate()
+
+    def _change_events(self, plan):
+        """Run plan(events) under the file lock; it returns (changes, result)."""
+        with _file_lock(event_files.EVENTS_FILE):
+            events = self.get_events()
+            changes, result = plan(events)
+            if changes:
+                self._commit_events(events, changes)
+        return result
+
+    def _commit_events(self, events, changes):
+        for change in changes:
+            apply_event_change(events, change)
+        save_events(events)
+        self._events_cache.advance(event_files.EVENTS_FILE, changes)
+
+    def add_event(self, event):
+        event = normalize_event({**event, "id": new_id()})
+        self._change_events(lambda events: ([{"op": "put_event", "event": event}], None))
+        return event
+
+    def update_event(self, event_id, fields):
+        """Update one event in place; returns the previous version, or None if it no longer exists."""
+
+        def plan(events):
+            index = find_index(events, event_id)
+            if index is None:
+                return [], None
+            return [{"op": "put_event", "event": {**events[index], **fields, "id": event_id}}], events[index]
+
+        return self._change_events(plan)
+
+    def delete_event(self, event_id):
+        def plan(events):
+            index = find_index(events, event_id)
+            if index is None:
+                return [], None
+            return [{"op": "delete_events", "ids": [event_id]}], events[index]
+
+        return self._change_events(plan)
+
+    def clear_past_events(self, since):
+        def plan(events):
+            ids = self._events_view(lambda timeline: [event["id"] for event in timeline.before(since)])
+            return ([{"op": "delete_events", "ids": ids}] if ids else []), len(ids)
+
+        return self._change_events(plan)
 
     def get_menu(self):
-        return load_menu()
+        return self._menu_cache.get(menu_files.MENU_FILE, _copy_menu)
 
     def save_menu(self, menu):
         save_menu(menu)
+        self._menu_cache.invalidate()
+
+    def _change_menu(self, plan):
+        with _file_lock(menu_files.MENU_FILE):
+            menu = self.get_menu()
+            changes, result = plan(menu)
+            if changes:
+                self._commit_menu(menu, changes)
+        return result
+
+    def _commit_menu(self, menu, changes):
+        for change in changes:
+            apply_menu_change(menu, change)
+        save_menu(menu)
+        self._menu_cache.advance(menu_files.MENU_FILE, changes)
+
+    def add_section(self, name):
+        section = {"id": new_id(), "section": name}
+        self._change_menu(lambda menu: ([{"op": "put_section", "section": section}], None))
+        return {**section, "items": []}
+
+    def delete_section(self, section_id):
+        def plan(menu):
+            index = find_index(menu, section_id)
+            if index is None:
+                return [], None
+            return [{"op": "delete_section", "id": section_id}], menu[index]
+
+        return self._change_menu(plan)
+
+    def add_item(self, section_id, item):
+        """Append an item to a section; returns the section, or None if it no longer exists."""
+        item = {**item, "id": new_id()}
+
+        def plan(menu):
+            index = find_index(menu, section_id)
+            if index is None:
+                return [], None
+            return [{"op": "put_item", "section_id": section_id, "item": item}], menu[index]
+
+        return self._change_menu(plan)
+
+    def update_item(self, section_id, item_id, item):
+        """Replace one item; returns (section, previous item), or None if either no longer exists."""
+
+        def plan(menu):
+            index = find_index(menu, section_id)
+            item_index = None if index is None else find_index(menu[index]["items"], item_id)
+            if item_index is None:
+                return [], None
+            section = menu[index]
+            change = {"op": "put_item", "section_id": section_id, "item": {**item, "id": item_id}}
+            return [change], (section, section["items"][item_index])
+
+        return self._change_menu(plan)
+
+    def delete_item(self, section_id, item_id):
+        def plan(menu):
+            index = find_index(menu, section_id)
+            item_index = None if index is None else find_index(menu[index]["items"], item_id)
+            if item_index is None:
+                return [], None
+            section = menu[index]
+            change = {"op": "delete_item", "section_id": section_id, "id": item_id}
+            return [change], (section, section["items"][item_index])
+
+        return self._change_menu(plan)
+
+    def cache_stats(self):
+        return {"events": self._events_cache.stats(), "menu": self._menu_cache.stats()}
+
+
+def _reset_journal(path):
+    journal_path = _journal_path(path)
+    tmp_path = f"{journal_path}.{os.getpid()}.tmp"
+    open(tmp_path, "wb").close()
+    os.replace(tmp_path, journal_path)
+
+
+def _trim_torn_record(fd):
+    size = os.fstat(fd).st_size
+    if size and os.pread(fd, 1, size - 1) != b"\n":
+        os.ftruncate(fd, os.pread(fd, size, 0).rfind(b"\n") + 1)
+
+
+@dataclass
+class JournaledContentStore(JsonContentStore):
+    """JSON store that appends one small journal record per edit instead of rewriting the file.
+
+    The JSON files become snapshots; readers rebuild state from snapshot plus journal tail.
+    Once a journal passes `compact_bytes` a background thread folds it into a new snapshot.
+    """
+
+    compact_bytes: int = DEFAULT_COMPACT_BYTES
+    _events_cache: JournalCache = field(
+        default_factory=lambda: JournalCache(_load_event_timeline, EventTimeline.apply), init=False, repr=False
+    )
+    _menu_cache: JournalCache = field(
+        default_factory=lambda: JournalCache(_load_menu_with_ids, apply_menu_change), init=False, repr=False
+    )
+    _compactions: dict = field(default_factory=dict, init=False, repr=False)
+    _compactions_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _collection(self, kind):
+        if kind == "events":
+            return event_files.EVENTS_FILE, self._events_cache, save_events
+        return menu_files.MENU_FILE, self._menu_cache, save_menu
+
+    def version(self, kind):
+        path = self._path(kind)
+        journal = _file_signature(_journal_path(path))
+        return _version_token(_file_signature(path), journal and (journal[0], journal[2]))
+
+    def last_modified(self, kind):
+        path = self._path(kind)
+        times = [value for value in (_file_modified(path), _file_modified(_journal_path(path))) if value]
+        return max(times, default=None)
+
+    def _replace(self, kind, value):
+        path, cache, write_snapshot = self._collection(kind)
+        with _file_lock(path):
+            write_snapshot(value)
+            _reset_journal(path)
+        cache.invalidate()
+
+    def save_events(self, events):
+        self._replace("events", events)
+
+    def save_menu(self, menu):
+        self._replace("menu", menu)
+
+    def _commit_events(self, events, changes):
+        self._append("events", changes)
+
+    def _commit_menu(self, menu, changes):
+        self._append("menu", changes)
+
+    def _append(self, kind, changes):
+        """Append change records; callers already hold the collection's file lock."""
+        path = self._collection(kind)[0]
+        data = "".join(json.dumps(change, default=_json_default) + "\n" for change in changes).encode()
+        fd = os.open(_journal_path(path), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _trim_torn_record(fd)
+            os.write(fd, data)
+            os.fsync(fd)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size >= self.compact_bytes:
+            self._compact_in_background(kind)
+
+    def compact(self, kind):
+        """Fold the `kind` journal ("events" or "menu") into its snapshot; returns False if it was empty."""
+        path, cache, _ = self._collection(kind)
+        with _file_lock(path):
+            if not _file_size(_journal_path(path)):
+                return False
+            if kind == "events":
+                save_events(cache.get(path, lambda timeline: _copy_events(timeline.rows)))
+            else:
+                save_menu(cache.get(path, _copy_menu))
+            _reset_journal(path)
+        return True
+
+    def _compact_in_background(self, kind):
+        with self._compactions_lock:
+            running = self._compactions.get(kind)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(target=self._run_compaction, args=(kind,), name=f"compact-{kind}", daemon=True)
+            self._compactions[kind] = thread
+        thread.start()
+
+    def _run_compaction(self, kind):
+        try:
+            self.compact(kind)
+        except Exception:
+            log.exception("journal compaction failed for %s", kind)
 
 
 def create_store():
-    return JsonContentStore()
+    """Build the store named by CONTENT_STORE: "json" (default), "journal" or "sqlite"."""
+    kind = os.getenv("CONTENT_STORE", "json").lower()
+    if kind == "json":
+        return JsonContentStore()
+    if kind == "journal":
+        return JournaledContentStore(compact_bytes=int(os.getenv("JOURNAL_COMPACT_BYTES", DEFAULT_COMPACT_BYTES)))
+    if kind == "sqlite":
+        return SqliteContentStore(os.getenv("CONTENT_DB_PATH", DEFAULT_DB_PATH))
+    raise RuntimeError(f"Unknown CONTENT_STORE: {kind}")
@@ -0,0 +1,92 @@
+from bisect import bisect_left
+from itertools import count
+
+from .content import find_index, normalize_event
+
+
+class EventTimeline:
+    """Events in list order, plus a date-sorted index of dated events and the pinned ones.
+
+    Applying a change record updates the index in place, so "dated events on or after a
+    day" is a binary search and a slice rather than a scan and sort of every event.
+    Events on the same day keep their list order.
+    """
+
+    def __init__(self, events=()):
+        self.rows = [normalize_event(event) for event in events]
+        self._sequence = count()
+        self._pinned = {}
+        self._entries = {}
+        dated = []
+        for event in self.rows:
+            sequence = next(self._sequence)
+            if event["pinned"]:
+                self._pinned[event["id"]] = (sequence, event)
+                self._entries[event["id"]] = (None, sequence)
+            else:
+                key = (event["date"].toordinal(), sequence)
+                dated.append((key, event))
+                self._entries[event["id"]] = (key, sequence)
+        dated.sort(key=lambda entry: entry[0])
+        self._keys = [key for key, _ in dated]
+        self._dated = [event for _, event in dated]
+
+    def apply(self, change):
+        """Apply one change record (see content.apply_event_change) to the rows and the index."""
+        if change["op"] == "put_event":
+            event = normalize_event(change["event"])
+            index = find_index(self.rows, event["id"])
+            if index is None:
+                self.rows.append(event)
+            else:
+                self.rows[index] = event
+            sequence = self._unindex(event["id"])
+            self._index(event, next(self._sequence) if sequence is None else sequence)
+        elif change["op"] == "delete_events":
+            doomed = set(change["ids"])
+            self.rows[:] = [event for event in self.rows if event["id"] not in doomed]
+            for event_id in doomed:
+                self._unindex(event_id)
+        else:
+            raise ValueError(f"Unknown event change: {change['op']}")
+        return self
+
+    def _index(self, event, sequence):
+        if event["pinned"]:
+            self._pinned[event["id"]] = (sequence, event)
+            self._entries[event["id"]] = (None, sequence)
+            return
+        key = (event["date"].toordinal(), sequence)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._dated.insert(position, event)
+        self._entries[event["id"]] = (key, sequence)
+
+    def _unindex(self, event_id):
+        """Drop an event from the date index or pinned set; returns its sequence number."""
+        entry = self._entries.pop(event_id, None)
+        if entry is None:
+            return None
+        key, sequence = entry
+        if key is None:
+            del self._pinned[event_id]
+        else:
+            position = bisect_left(self._keys, key)
+            del self._keys[position]
+            del self._dated[position]
+        return sequence
+
+    def pinned(self):
+        return [event for _, event in sorted(self._pinned.values(), key=lambda entry: entry[0])]
+
+    def on_or_after(self, day):
+        return self._dated[bisect_left(self._keys, (day.toordinal(),)):]
+
+    def between(self, since=None, until=None):
+        """Dated events from `since` through `until` (both inclusive; None leaves that end open)."""
+        start = 0 if since is None else bisect_left(self._keys, (since.toordinal(),))
+        end = len(self._keys) if until is None else bisect_left(self._keys, (until.toordinal() + 1,))
+        return self._dated[start:end]
+
+    def before(self, day):
+        return self._dated[:bisect_left(self._keys, (day.toordinal(),))]
@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
+
+from .recurrence import MAX_EXCEPTIONS, MAX_INTERVAL, WeeklyRule
 
 
 EVENT_TITLE_MAX = 80
@@ -21,9 +23,13 @@ def sanitize_text(value, allow_newlines=False):
     return "".join(cleaned).strip()
 
 
-def validate_event_form(title, date_str, description, pinned):
+def validate_event_form(title, date_str, description, pinned, repeat="", interval="", weekday="", exceptions=""):
     title = sanitize_text(title)
     description = sanitize_text(description, allow_newlines=True)
+    repeat = sanitize_text(repeat)
+    interval = sanitize_text(interval)
+    weekday = sanitize_text(weekday)
+    exceptions = sanitize_text(exceptions)
     errors = {}
 
     if not title:
@@ -34,20 +40,72 @@ def validate_event_form(title, date_str, description, pinned):
     if len(description) > EVENT_DESCRIPTION_MAX:
         errors["description"] = f"Description must be {EVENT_DESCRIPTION_MAX} characters or fewer."
 
-    if not pinned:
+    # A repeating event never expires, so it is stored as pinned; its date starts the series.
+    pinned = pinned or repeat == "weekly"
+    if not pinned or date_str:
         try:
             datetime.strptime(date_str or "", "%Y-%m-%d")
         except ValueError:
             errors["date"] = "Enter a valid date."
 
+    recurrence = None
+    if repeat not in ("", "weekly"):
+        errors["repeat"] = "Choose how often the event repeats."
+    elif repeat == "weekly":
+        recurrence, recurrence_errors = _validate_weekly_rule(interval, weekday, exceptions, date_str)
+        errors.update(recurrence_errors)
+
     return {
         "title": title,
         "date": date_str or "",
         "description": description,
         "pinned": pinned,
+        "repeat": repeat,
+        "interval": interval,
+        "weekday": weekday,
+        "exceptions": exceptions,
+        "recurrence": recurrence,
     }, errors
 
 
+def _validate_weekly_rule(interval, weekday, exceptions, date_str):
+    errors = {}
+    try:
+        interval_weeks = int(interval or 1)
+    except ValueError:
+        interval_weeks = 0
+    if not 1 <= interval_weeks <= MAX_INTERVAL:
+        errors["interval"] = f"Repeat every 1 to {MAX_INTERVAL} weeks."
+
+    if weekday:
+        try:
+            day_of_week = int(weekday)
+        except ValueError:
+            day_of_week = -1
+    else:
+        # Default to the weekday of the start date (or today's, like the start date itself).
+        try:
+            day_of_week = datetime.strptime(date_str, "%Y-%m-%d").weekday() if date_str else date.today().weekday()
+        except ValueError:
+            day_of_week = date.today().weekday()
+    if not 0 <= day_of_week <= 6:
+        errors["weekday"] = "Choose a day of the week."
+
+    skipped = set()
+    for value in exceptions.replace(",", " ").split():
+        try:
+            skipped.add(datetime.strptime(value, "%Y-%m-%d").date())
+        except ValueError:
+            errors["exceptions"] = f"“{value[:20]}” is not a YYYY-MM-DD date."
+            break
+    if len(skipped) > MAX_EXCEPTIONS:
+        errors["exceptions"] = f"List at most {MAX_EXCEPTIONS} skipped dates."
+
+    if errors:
+        return None, errors
+    return WeeklyRule(day_of_week, interval_weeks, tuple(sorted(skipped))).to_dict(), errors
+
+
 def validate_section_form(section_name):
     section_name = sanitize_text(section_name)
     errors = {}
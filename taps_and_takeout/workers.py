@@ -0,0 +1,35 @@
+import time
+
+from gunicorn.workers.gthread import ThreadWorker
+
+
+QUEUE_START_HEADER = "X-REQUEST-START"
+
+
+class QueueTimedThreadWorker(ThreadWorker):
+    """gthread worker that tells the app how long each request waited for a thread.
+
+    Requests beyond the worker's threads wait in its thread-pool queue, where the app
+    cannot see them. The worker times each connection from being handed to the pool until
+    a thread picks it up, and passes that wait on as `X-Request-Start: t=<ms>` (the parse
+    time minus the wait), replacing any value sent by the client, so admission control can
+    shed requests that already waited too long. Time spent waiting for the client to send
+    its request is not counted.
+    """
+
+    def enqueue_req(self, conn):
+        conn.queued_at = time.time()
+        super().enqueue_req(conn)
+
+    def handle(self, conn):
+        queued_at = getattr(conn, "queued_at", None)
+        conn.pool_wait = None if queued_at is None else time.time() - queued_at
+        return super().handle(conn)
+
+    def handle_request(self, req, conn):
+        pool_wait = getattr(conn, "pool_wait", None)
+        if pool_wait is not None:
+            started = time.time() - pool_wait
+            req.headers = [(name, value) for name, value in req.headers if name != QUEUE_START_HEADER]
+            req.headers.append((QUEUE_START_HEADER, f"t={started * 1000:.0f}"))
+        return super().handle_request(req, conn)
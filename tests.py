@@ -1,14 +1,40 @@
+import gzip
+import io
+import logging
+import multiprocessing
 import os
+import threading
+import time
+import types
 import json
 import pytest
+import tempfile
+from gunicorn.workers.gthread import ThreadWorker
+from limits.storage import storage_from_string
 from datetime import date, timedelta
 
 os.environ.setdefault("ADMIN_PASSWORD", "testpass")
 os.environ.setdefault("FLASK_SECRET_KEY", "test-secret-key")
+# Keep the shared test app's metrics files and template bytecode out of the real data/ directory.
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="taps-tests-")
+os.environ.setdefault("METRICS_DIR", os.path.join(TEST_DATA_DIR, "metrics"))
+os.environ.setdefault("JINJA_CACHE_DIR", os.path.join(TEST_DATA_DIR, "jinja_cache"))
 
 import app as flask_app
 import events as events_module
 import menu_data as menu_module
+from taps_and_takeout import create_app, warm_up
+from taps_and_takeout.admission import AdmissionController, queue_time
+from taps_and_takeout.assets import choose_encoding, compress_static, find_precompressed
+from taps_and_takeout.images import build_image_variants, load_variant_index, picture
+from taps_and_takeout.logging_utils import BatchingQueueHandler, StructuredFormatter, log_admin_action
+from taps_and_takeout.metrics import MetricsRegistry
+from taps_and_takeout.rate_limit import SqliteRateLimitStorage
+from taps_and_takeout.search import SearchIndex
+from taps_and_takeout.sqlite_store import SqliteContentStore
+from taps_and_takeout.storage import JournaledContentStore, JsonContentStore
+from taps_and_takeout.timeline import EventTimeline
+from taps_and_takeout.workers import QueueTimedThreadWorker
 
 
 # ---------------------------------------------------------------------------
@@ -89,6 +115,226 @@ def test_save_load_menu_round_trip(tmp_path, monkeypatch):
     assert loaded[0]["items"][0]["name"] == "Beer"
 
 
+# ---------------------------------------------------------------------------
+# Content store tests
+# ---------------------------------------------------------------------------
+
+def test_store_reuses_parsed_events_until_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    events_module.save_events([{"title": "First", "date": date(2026, 6, 1), "description": ""}])
+    store = JsonContentStore()
+    assert store.get_events()[0]["title"] == "First"
+    assert store.get_events()[0]["title"] == "First"
+    assert store.cache_stats()["events"] == {"hits": 1, "misses": 1}
+
+    events_module.save_events([{"title": "Second, longer", "date": date(2026, 6, 1), "description": ""}])
+    assert store.get_events()[0]["title"] == "Second, longer"
+    assert store.cache_stats()["events"]["misses"] == 2
+
+
+def test_store_returns_copies_of_cached_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_module, "MENU_FILE", str(tmp_path / "menu.json"))
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": "Beer", "description": "Cold"}]}])
+    store = JsonContentStore()
+    menu = store.get_menu()
+    menu[0]["items"].append({"name": "Wine", "description": ""})
+    menu.append({"section": "Food", "items": []})
+    assert store.get_menu() == [{"id": "0", "section": "Drinks", "items": [{"id": "0", "name": "Beer", "description": "Cold"}]}]
+
+
+def test_journaled_store_appends_instead_of_rewriting(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    events_module.save_events([{"title": "Snapshot", "date": date(2026, 6, 1), "description": ""}])
+    snapshot = (tmp_path / "events.json").read_text()
+    store = JournaledContentStore()
+    added = store.add_event({"title": "Journaled", "date": "2026-06-02", "description": ""})
+    store.update_event(added["id"], {"title": "Journaled Again"})
+
+    assert (tmp_path / "events.json").read_text() == snapshot
+    assert len((tmp_path / "events.journal").read_text().splitlines()) == 2
+    other_worker = JournaledContentStore()
+    assert [event["title"] for event in other_worker.get_events()] == ["Snapshot", "Journaled Again"]
+    store.delete_event(added["id"])
+    assert [event["title"] for event in other_worker.get_events()] == ["Snapshot"]
+    assert other_worker.cache_stats()["events"]["tail_reads"] == 1
+
+
+def test_journaled_store_compaction_folds_journal_into_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    store = JournaledContentStore(compact_bytes=1)
+    store.add_event({"title": "Compacted", "date": "2026-06-02", "description": ""})
+    store._compactions["events"].join(timeout=5)
+
+    assert (tmp_path / "events.journal").read_text() == ""
+    assert [event["title"] for event in events_module.load_events()] == ["Compacted"]
+    assert [event["title"] for event in store.get_events()] == ["Compacted"]
+    assert store.compact("events") is False
+
+
+def test_journaled_store_ignores_torn_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_module, "MENU_FILE", str(tmp_path / "menu.json"))
+    store = JournaledContentStore()
+    menu_module.save_menu([])
+    section = store.add_section("Drinks")
+    with open(tmp_path / "menu.journal", "a") as f:
+        f.write('{"op": "put_section", "sect')
+    assert [s["section"] for s in store.get_menu()] == ["Drinks"]
+
+    store.add_item(section["id"], {"name": "Beer", "description": ""})
+    assert [item["name"] for item in JournaledContentStore().get_menu()[0]["items"]] == ["Beer"]
+
+
+def test_event_timeline_slices_by_date_and_updates_incrementally():
+    timeline = EventTimeline([
+        {"id": "b", "title": "B", "date": date(2026, 6, 3), "description": ""},
+        {"id": "a", "title": "A", "date": date(2026, 6, 1), "description": ""},
+        {"id": "p", "title": "P", "date": date(2000, 1, 1), "description": "", "pinned": True},
+        {"id": "c", "title": "C", "date": date(2026, 6, 3), "description": ""},
+    ])
+    assert [event["id"] for event in timeline.on_or_after(date(2026, 6, 2))] == ["b", "c"]
+    assert [event["id"] for event in timeline.before(date(2026, 6, 2))] == ["a"]
+    assert [event["id"] for event in timeline.pinned()] == ["p"]
+
+    timeline.apply({"op": "put_event", "event": {"id": "a", "title": "A", "date": "2026-06-05", "description": ""}})
+    timeline.apply({"op": "put_event", "event": {"id": "d", "title": "D", "date": "2026-06-02", "description": ""}})
+    timeline.apply({"op": "delete_events", "ids": ["c", "p"]})
+    assert [event["id"] for event in timeline.on_or_after(date(2026, 6, 1))] == ["d", "b", "a"]
+    assert timeline.pinned() == []
+    assert [event["id"] for event in timeline.rows] == ["b", "a", "d"]
+
+
+def test_store_updates_timeline_without_reparsing_own_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    store = JsonContentStore()
+    store.add_event({"title": "Old", "date": "2026-05-01", "description": ""})
+    store.add_event({"title": "New", "date": "2026-06-10", "description": ""})
+    misses = store.cache_stats()["events"]["misses"]
+    assert store.clear_past_events(date(2026, 6, 1)) == 1
+    pinned, upcoming = store.get_upcoming_events(date(2026, 6, 1))
+    assert [event["title"] for event in upcoming] == ["New"]
+    assert store.cache_stats()["events"]["misses"] == misses
+    assert [event["title"] for event in JsonContentStore().get_events()] == ["New"]
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_store_query_events_returns_one_filtered_window(kind, tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    store = JsonContentStore() if kind == "json" else SqliteContentStore(str(tmp_path / "content.db"))
+    store.save_events(
+        [{"title": f"Gig {n}", "date": date(2026, 6, 30 - n), "description": "live" if n % 2 else "", "pinned": False} for n in range(10)]
+        + [{"title": "Weekly 100% Quiz", "date": date(2000, 1, 1), "description": "", "pinned": True}]
+    )
+
+    rows, total = store.query_events(offset=0, limit=3)
+    assert total == 11
+    assert [event["title"] for event in rows] == ["Weekly 100% Quiz", "Gig 9", "Gig 8"]
+    rows, total = store.query_events(since=date(2026, 6, 22), until=date(2026, 6, 25), offset=1, limit=2)
+    assert total == 4
+    assert [event["title"] for event in rows] == ["Gig 7", "Gig 6"]
+    rows, total = store.query_events(text="LIVE", offset=4, limit=10)
+    assert total == 5
+    assert [event["title"] for event in rows] == ["Gig 1"]
+    assert store.query_events(text="100%")[1] == 1
+    assert store.query_events(text="_")[1] == 0
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SqliteContentStore(str(tmp_path / "content.db"))
+    store.save_events([{"title": "Quiz", "date": date(2026, 6, 1), "description": "Teams of 4", "pinned": False}])
+    store.save_menu([{"section": "Drinks", "items": [{"name": "Beer", "description": "Cold"}]}])
+    event = store.get_events()[0]
+    assert (event["title"], event["date"], event["description"], event["pinned"]) == ("Quiz", date(2026, 6, 1), "Teams of 4", False)
+    menu = store.get_menu()
+    assert menu[0]["section"] == "Drinks"
+    assert menu[0]["items"][0]["name"] == "Beer"
+    conn = store._connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_store_upcoming_events_uses_date_index(tmp_path):
+    store = SqliteContentStore(str(tmp_path / "content.db"))
+    store.save_events([
+        {"title": "Later", "date": date(2026, 6, 10), "description": ""},
+        {"title": "Past", "date": date(2026, 5, 1), "description": ""},
+        {"title": "Weekly", "date": date(2000, 1, 1), "description": "", "pinned": True},
+        {"title": "Sooner", "date": date(2026, 6, 2), "description": ""},
+    ])
+    pinned, upcoming = store.get_upcoming_events(date(2026, 6, 1))
+    assert [event["title"] for event in pinned] == ["Weekly"]
+    assert [event["title"] for event in upcoming] == ["Sooner", "Later"]
+    plan = store._connection().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM events WHERE pinned = 0 AND date >= ? ORDER BY date, position", ("2026-06-01",)
+    ).fetchall()
+    assert any("events_pinned_date" in row[-1] for row in plan)
+
+
+def test_sqlite_store_row_operations(tmp_path):
+    store = SqliteContentStore(str(tmp_path / "content.db"))
+    kept = store.add_event({"title": "Kept", "date": "2026-06-01", "description": ""})
+    gone = store.add_event({"title": "Gone", "date": "2026-06-02", "description": ""})
+    assert store.update_event(kept["id"], {"title": "Kept!"})["title"] == "Kept"
+    assert store.delete_event(gone["id"])["title"] == "Gone"
+    assert store.delete_event(gone["id"]) is None
+    assert [event["title"] for event in store.get_events()] == ["Kept!"]
+
+    section = store.add_section("Drinks")
+    store.add_item(section["id"], {"name": "Beer", "description": ""})
+    item_id = store.get_menu()[0]["items"][0]["id"]
+    assert store.update_item(section["id"], item_id, {"name": "Lager", "description": "$5"})[1]["name"] == "Beer"
+    assert store.get_menu()[0]["items"] == [{"id": item_id, "name": "Lager", "description": "$5"}]
+    assert store.add_item("missing", {"name": "X", "description": ""}) is None
+    assert store.delete_section(section["id"])["section"] == "Drinks"
+    assert store.get_menu() == []
+
+
+def test_import_json_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    monkeypatch.setattr(menu_module, "MENU_FILE", str(tmp_path / "menu.json"))
+    monkeypatch.setenv("CONTENT_STORE", "sqlite")
+    monkeypatch.setenv("CONTENT_DB_PATH", str(tmp_path / "content.db"))
+    events_module.save_events([{"title": "Quiz", "date": date(2026, 6, 1), "description": ""}])
+    menu_module.save_menu([{"section": "Drinks", "items": []}])
+    app = create_app()
+
+    result = app.test_cli_runner().invoke(args=["import-json"])
+    assert "Imported 1 event(s) and 1 menu section(s)" in result.output
+    assert app.extensions["content_store"].get_events()[0]["title"] == "Quiz"
+    assert app.test_cli_runner().invoke(args=["import-json"]).exit_code != 0
+
+
+# ---------------------------------------------------------------------------
+# Benchmark suite tests
+# ---------------------------------------------------------------------------
+
+def test_benchmark_datasets_have_requested_sizes():
+    from benchmarks.datasets import make_events, make_menu
+
+    assert len(make_events(250)) == 250
+    assert make_events(5, seed=1) == make_events(5, seed=1)
+    menu = make_menu(45)
+    assert sum(len(section["items"]) for section in menu) == 45
+
+
+def test_benchmark_compare_flags_regressions_over_threshold():
+    from benchmarks.suite import compare
+
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "tiny": {"median_ms": 0.01}}}
+    current = {"results": {"a": {"median_ms": 11.0}, "b": {"median_ms": 13.0}, "tiny": {"median_ms": 0.02}, "new": {"median_ms": 1.0}}}
+    assert compare(baseline, current, threshold=0.2, min_delta_ms=0.05) == ["b"]
+
+
+def test_loadtest_summary_and_sweep_parsing():
+    from benchmarks.loadtest import error_rate, parse_sweep, summarize
+
+    samples = [("menu", 200, 0.010)] * 97 + [("menu", 503, 0.001), ("admin", 302, 0.050), ("admin", "error", 1.0)]
+    summary = summarize(samples, elapsed=2.0)
+    assert summary["overall"]["requests"] == 100
+    assert summary["overall"]["rps"] == 50.0
+    assert summary["by_request"]["menu"]["p50_ms"] == 10.0
+    assert error_rate(summary["overall"]) == 0.02
+    assert parse_sweep("1x4,2X2") == [(1, 4), (2, 2)]
+
+
 # ---------------------------------------------------------------------------
 # Public route tests
 # ---------------------------------------------------------------------------
@@ -155,6 +401,886 @@ def test_events_sorted_ascending(client):
     assert html.index("Sooner") < html.index("Later")
 
 
+# ---------------------------------------------------------------------------
+# Page cache tests
+# ---------------------------------------------------------------------------
+
+def test_menu_page_served_from_cache_until_content_changes(client):
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": "Beer", "description": ""}]}])
+    cache = flask_app.app.extensions["page_cache"]
+    cache.clear()
+    assert "Beer" in client.get("/menu").data.decode()
+    hits = cache.hits
+    assert "Beer" in client.get("/menu").data.decode()
+    assert cache.hits == hits + 1
+
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": "Cider", "description": ""}]}])
+    assert "Cider" in client.get("/menu").data.decode()
+
+
+def test_admin_write_invalidates_cached_events_page(client):
+    assert "Trivia" not in client.get("/events").data.decode()
+    login(client)
+    client.post("/admin-events", data={"action": "add", "title": "Trivia", "date": date.today().isoformat(), "description": ""})
+    assert flask_app.app.extensions["page_cache"].stats()["entries"] == 0
+    assert "Trivia" in client.get("/events").data.decode()
+
+
+def test_menu_revalidation_returns_304(client):
+    menu_module.save_menu([{"section": "Drinks", "items": []}])
+    first = client.get("/menu")
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    r = client.get("/menu", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.data == b""
+    assert client.get("/menu", headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+    menu_module.save_menu([{"section": "Food", "items": []}])
+    r = client.get("/menu", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_events_etag_depends_on_the_day(client):
+    etag = client.get("/events").headers["ETag"]
+    stale = etag.replace(date.today().isoformat(), (date.today() - timedelta(days=1)).isoformat())
+    assert stale != etag
+    assert client.get("/events", headers={"If-None-Match": stale}).status_code == 200
+    assert client.get("/events", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_cached_pages_do_not_vary_on_cookie_without_a_session(client):
+    flask_app.app.extensions["page_cache"].clear()
+    for _ in range(2):
+        for path in ("/menu", "/events", "/events.ics"):
+            r = client.get(path)
+            r.get_data()
+            assert "Cookie" not in r.headers["Vary"], path
+
+
+def test_cached_page_compressed_once_per_encoding(client, monkeypatch):
+    import taps_and_takeout.compression as compression
+
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": f"Beer {n}", "description": "Hoppy"} for n in range(40)]}])
+    flask_app.app.extensions["page_cache"].clear()
+    calls = []
+    real_compress = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda *a, **kw: calls.append(a[1]) or real_compress(*a, **kw))
+
+    plain = client.get("/menu")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+    for _ in range(2):
+        r = client.get("/menu", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(r.data) == plain.data
+        assert r.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert calls == ["gzip"]
+    revalidated = client.get("/menu", headers={"If-None-Match": r.headers["ETag"], "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == r.headers["ETag"]
+
+
+def test_uncached_responses_compressed_above_threshold(client):
+    login(client)
+    r = client.get("/admin-events", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert b"</html>" in gzip.decompress(r.data)
+    small = client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_store_versions_change_on_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_FILE", str(tmp_path / "events.json"))
+    for store in (JsonContentStore(), JournaledContentStore(), SqliteContentStore(str(tmp_path / "content.db"))):
+        before = store.version("events")
+        menu_before = store.version("menu")
+        store.add_event({"title": "Quiz", "date": "2026-06-01", "description": ""})
+        assert store.version("events") != before
+        assert store.version("menu") == menu_before
+
+
+# ---------------------------------------------------------------------------
+# JSON API tests
+# ---------------------------------------------------------------------------
+
+def test_api_events_paginates_with_cursor(client):
+    today = date.today()
+    events_module.save_events(
+        [{"title": "Weekly Quiz", "date": date(2000, 1, 1), "description": "", "pinned": True}]
+        + [{"title": f"Gig {n}", "date": today + timedelta(days=n), "description": "", "pinned": False} for n in range(5)]
+    )
+    first = client.get("/api/events?limit=4").get_json()
+    assert [event["title"] for event in first["data"]] == ["Weekly Quiz", "Gig 0", "Gig 1", "Gig 2"]
+    second = client.get(f"/api/events?limit=4&cursor={first['next_cursor']}").get_json()
+    assert [event["title"] for event in second["data"]] == ["Gig 3", "Gig 4"]
+    assert second["next_cursor"] is None
+
+
+def test_api_events_filters_and_fields(client):
+    today = date.today()
+    events_module.save_events([
+        {"title": "Pinned", "date": date(2000, 1, 1), "description": "", "pinned": True},
+        {"title": "Soon", "date": today + timedelta(days=1), "description": "", "pinned": False},
+        {"title": "Later", "date": today + timedelta(days=30), "description": "", "pinned": False},
+    ])
+    to = (today + timedelta(days=7)).isoformat()
+    r = client.get(f"/api/events?pinned=0&to={to}&fields=title,date")
+    assert r.mimetype == "application/json"
+    assert r.get_json()["data"] == [{"title": "Soon", "date": (today + timedelta(days=1)).isoformat()}]
+
+    assert client.get("/api/events?fields=title,secret").status_code == 400
+    assert client.get("/api/events?from=tomorrow").status_code == 400
+    assert client.get("/api/events?limit=0").status_code == 400
+    assert client.get("/api/events?cursor=not-a-cursor").status_code == 400
+
+
+def test_api_rejects_hand_built_cursors_with_bad_offsets(client):
+    from taps_and_takeout.routes.api import _encode_cursor
+
+    events_module.save_events(
+        [{"title": f"Gig {n}", "date": date.today() + timedelta(days=n), "description": "", "pinned": False} for n in range(3)]
+    )
+    version = flask_app.app.extensions["content_store"].version("events")
+    for offset in (-5, 1.5, "1", True):
+        r = client.get(f"/api/events?limit=1&cursor={_encode_cursor(version, offset)}")
+        assert r.status_code == 400, offset
+        assert r.get_json()["error"] == "Invalid cursor."
+    assert client.get(f"/api/events?limit=1&cursor={_encode_cursor(version, 1)}").get_json()["data"][0]["title"] == "Gig 1"
+
+
+def test_api_cursor_is_stale_after_an_edit(client):
+    events_module.save_events(
+        [{"title": f"Gig {n}", "date": date.today() + timedelta(days=n), "description": "", "pinned": False} for n in range(3)]
+    )
+    cursor = client.get("/api/events?limit=1").get_json()["next_cursor"]
+    login(client)
+    client.post("/admin-events", data={"action": "add", "title": "Trivia", "date": date.today().isoformat(), "description": ""})
+    r = client.get(f"/api/events?limit=1&cursor={cursor}")
+    assert r.status_code == 409
+    assert "start again" in r.get_json()["error"]
+
+
+def test_api_repeat_polls_reuse_serialized_bytes(client, monkeypatch):
+    import taps_and_takeout.routes.api as api
+
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": "Lager", "description": "$5"}]}])
+    flask_app.app.extensions["api_cache"].clear()
+    calls = []
+    real_dumps = api._dumps
+    monkeypatch.setattr(api, "_dumps", lambda payload: calls.append(payload) or real_dumps(payload))
+
+    first = client.get("/api/menu?fields=name")
+    assert first.get_json()["data"][0]["items"] == [{"name": "Lager"}]
+    second = client.get("/api/menu?fields=name")
+    assert second.data == first.data
+    assert len(calls) == 1
+    assert client.get("/api/menu?fields=name", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert client.get("/api/menu", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+    menu_module.save_menu([{"section": "Drinks", "items": [{"name": "Cider", "description": ""}]}])
+    assert client.get("/api/menu?fields=name").get_json()["data"][0]["items"] == [{"name": "Cider"}]
+
+
+# ---------------------------------------------------------------------------
+# iCalendar feed tests
+# ---------------------------------------------------------------------------
+
+def test_ical_fold_keeps_lines_within_75_octets():
+    from taps_and_takeout.ical import fold
+
+    folded = fold("DESCRIPTION:" + "Pint of stout 🍺 " * 20)
+    lines = folded.split("\r\n")
+    assert lines[-1] == ""
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert all(line.startswith(" ") for line in lines[1:-1])
+    assert "".join(line[1:] if n else line for n, line in enumerate(lines[:-1])) == "DESCRIPTION:" + "Pint of stout 🍺 " * 20
+
+
+def test_events_ics_feed(client):
+    tomorrow = date.today() + timedelta(days=1)
+    events_module.save_events([
+        {"title": "Weekly Quiz", "date": date(2000, 1, 6), "description": "Teams of 4; prizes, too", "pinned": True,
+         "recurrence": {"freq": "weekly", "weekday": 3, "interval": 1, "exceptions": []}},
+        {"title": "Sunday Roast", "date": date(2000, 1, 1), "description": "", "pinned": True},
+        {"title": "Live Jazz", "date": tomorrow, "description": "", "pinned": False},
+    ])
+    flask_app.app.extensions["page_cache"].clear()
+    r = client.get("/events.ics")
+    assert r.mimetype == "text/calendar"
+    body = r.data.decode()
+    assert body.startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+    assert body.endswith("END:VCALENDAR\r\n")
+    assert body.count("BEGIN:VEVENT") == 2
+    assert f"DTSTART;VALUE=DATE:{tomorrow:%Y%m%d}" in body
+    assert "DESCRIPTION:Teams of 4\\; prizes\\, too" in body
+    assert "DTSTART;VALUE=DATE:20000106" in body
+    assert "CATEGORIES:Recurring" in body
+    assert "Sunday Roast" not in body  # pinned without a schedule: no stable date to give it
+
+
+def test_events_ics_served_from_cache_and_revalidated(client, monkeypatch):
+    events_module.save_events([{"title": "Live Jazz", "date": date.today(), "description": "", "pinned": False}])
+    flask_app.app.extensions["page_cache"].clear()
+    first = client.get("/events.ics")
+    body = first.data
+    assert client.get("/events", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+    store = flask_app.app.extensions["content_store"]
+    monkeypatch.setattr(store, "get_upcoming_events", lambda since: pytest.fail("feed was rebuilt"))
+    hits = flask_app.app.extensions["page_cache"].hits
+    assert client.get("/events.ics").data == body
+    assert flask_app.app.extensions["page_cache"].hits == hits + 1
+    assert client.get("/events.ics", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+# ---------------------------------------------------------------------------
+# Search tests
+# ---------------------------------------------------------------------------
+
+def test_search_ranks_whole_words_and_title_matches_first(tmp_path):
+    store = SqliteContentStore(str(tmp_path / "content.db"))
+    store.add_event({"title": "Trivia Night", "date": "2026-06-01", "description": "Pub quiz"})
+    section = store.add_section("Drinks")
+    store.add_item(section["id"], {"name": "Triple IPA", "description": "Strong enough for trivia"})
+    store.add_item(section["id"], {"name": "Café au lait", "description": ""})
+    index = SearchIndex(store)
+
+    assert [result.get("title", result.get("name")) for _, result in index.search("trivia")] == ["Trivia Night", "Triple IPA"]
+    assert {result.get("title", result.get("name")) for _, result in index.search("tri")} == {"Trivia Night", "Triple IPA"}
+    assert [result["name"] for _, result in index.search("CAFE")] == ["Café au lait"]
+    assert [result["title"] for _, result in index.search("pub triv")] == ["Trivia Night"]
+    assert index.search("trivia karaoke") == []
+    assert index.search("  ") == []
+
+
+def test_search_index_updates_only_changed_documents(tmp_path, monkeypatch):
+    store = SqliteContentStore(str(tmp_path / "content.db"))
+    quiz = store.add_event({"title": "Quiz", "date": "2026-06-01", "description": ""})
+    store.add_event({"title": "Karaoke", "date": "2026-06-02", "description": ""})
+    index = SearchIndex(store)
+    index.refresh()
+    assert index.stats()["reindexed"] == 2
+
+    store.update_event(quiz["id"], {"title": "Bingo"})
+    assert [result["title"] for _, result in index.search("bingo")] == ["Bingo"]
+    assert index.search("quiz") == []
+    assert index.stats()["reindexed"] == 3
+
+    store.delete_event(quiz["id"])
+    assert index.search("bingo") == []
+    monkeypatch.setattr(store, "get_events", lambda: pytest.fail("index re-read unchanged content"))
+    assert len(index.search("karaoke")) == 1
+
+
+def test_search_page_and_api(client):
+    events_module.save_events([
+        {"title": "Jazz Night", "date": date.today() + timedelta(days=2), "description": "Live trio", "pinned": False},
+        {"title": "Old Jazz Brunch", "date": date.today() - timedelta(days=10), "description": "", "pinned": False},
+        {"title": "Jazz Sundays", "date": date(2000, 1, 1), "description": "", "pinned": True},
+    ])
+    menu_module.save_menu([{"section": "Cocktails", "items": [{"name": "Jazz Hands", "description": "Gin, lemon"}]}])
+
+    html = client.get("/search?q=jaz").data.decode()
+    assert "Jazz Night" in html and "Jazz Sundays" in html and "Jazz Hands" in html
+    assert "Old Jazz Brunch" not in html
+    assert "Nothing on the menu" in client.get("/search?q=polka").data.decode()
+
+    data = client.get("/api/search?q=gin").get_json()["data"]
+    assert data == [{"type": "item", "section": "Cocktails", "id": "0", "name": "Jazz Hands", "description": "Gin, lemon"}]
+    assert client.get("/api/search").status_code == 400
+
+
+def test_api_search_returns_one_off_events(client):
+    tomorrow = date.today() + timedelta(days=1)
+    events_module.save_events([{"title": "Trivia Night", "date": tomorrow, "description": "", "pinned": False}])
+    r = client.get("/api/search?q=trivia")
+    assert r.status_code == 200
+    assert r.get_json()["data"] == [{
+        "type": "event", "id": "0", "title": "Trivia Night", "date": tomorrow.isoformat(),
+        "description": "", "pinned": False, "recurrence": None,
+    }]
+
+
+# ---------------------------------------------------------------------------
+# Recurring event tests
+# ---------------------------------------------------------------------------
+
+def test_weekly_rule_occurrences_are_lazy_and_memoized():
+    from itertools import islice
+
+    from taps_and_takeout.recurrence import WeeklyRule, iter_occurrences, occurrences
+
+    # Every other Thursday from Thu 2026-06-04, skipping 2026-07-02.
+    rule = WeeklyRule(weekday=3, interval=2, exceptions=(date(2026, 7, 2),))
+    anchor = date(2026, 6, 1)
+    assert list(islice(iter_occurrences(rule, anchor, anchor), 3)) == [date(2026, 6, 4), date(2026, 6, 18), date(2026, 7, 16)]
+    # 2030-01-03 is a Thursday in the off week.
+    assert next(iter_occurrences(rule, anchor, date(2030, 1, 1))) == date(2030, 1, 10)
+    assert list(iter_occurrences(rule, anchor, date(2026, 6, 5), date(2026, 6, 18))) == [date(2026, 6, 18)]
+
+    occurrences.cache_clear()
+    window = (rule, anchor, date(2026, 6, 1), date(2026, 8, 1))
+    assert occurrences(*window) == (date(2026, 6, 4), date(2026, 6, 18), date(2026, 7, 16), date(2026, 7, 30))
+    assert occurrences(*window) is occurrences(*window)
+    assert occurrences.cache_info().hits == 2
+    assert WeeklyRule.from_dict(rule.to_dict()) == rule
+
+
+def test_occurrences_stop_before_date_max():
+    from taps_and_takeout.recurrence import WeeklyRule, iter_occurrences
+
+    rule = WeeklyRule(weekday=3)
+    tail = list(iter_occurrences(rule, date(9999, 12, 1), date(9999, 12, 1), date.max))
+    assert tail and tail[-1] <= date.max - timedelta(weeks=1)
+    assert list(iter_occurrences(rule, date(2026, 6, 1), date.max)) == []
+
+
+def test_api_events_rejects_oversized_expansion_windows(client):
+    events_module.save_events([
+        {"title": "Trivia", "date": date(2026, 6, 4), "description": "", "pinned": True,
+         "recurrence": {"freq": "weekly", "weekday": 3, "interval": 1, "exceptions": []}},
+    ])
+    assert client.get("/api/events?to=9999-12-31").status_code == 400
+    assert client.get("/api/events?from=0001-01-01&to=9000-01-01").status_code == 400
+    assert client.get("/api/events?from=2020-01-01").status_code == 400
+    r = client.get("/api/events?from=2026-06-01&to=2027-06-01&limit=200")
+    assert r.status_code == 200
+    assert len(r.get_json()["data"]) == 52
+
+
+def test_validate_event_form_recurrence():
+    from taps_and_takeout.validation import validate_event_form
+
+    cleaned, errors = validate_event_form("Quiz", "2026-06-04", "", False, "weekly", "2", "", "2026-07-02, 2026-06-18")
+    assert errors == {}
+    assert cleaned["pinned"] is True
+    assert cleaned["recurrence"] == {"freq": "weekly", "weekday": 3, "interval": 2, "exceptions": ["2026-06-18", "2026-07-02"]}
+
+    _, errors = validate_event_form("Quiz", "", "", False, "weekly", "0", "9", "someday")
+    assert set(errors) == {"interval", "weekday", "exceptions"}
+    assert validate_event_form("Quiz", "2026-06-04", "", False, "monthly")[1] == {"repeat": "Choose how often the event repeats."}
+    assert validate_event_form("Quiz", "2026-06-04", "", False)[0]["recurrence"] is None
+
+
+def test_recurring_event_expands_on_public_pages_and_feed(client):
+    today = date.today()
+    skipped = today + timedelta(days=(3 - today.weekday()) % 7 + 7)
+    events_module.save_events([
+        {"title": "Trivia", "date": today - timedelta(days=60), "description": "", "pinned": True,
+         "recurrence": {"freq": "weekly", "weekday": 3, "interval": 1, "exceptions": [skipped.isoformat()]}},
+        {"title": "Open Mic", "date": today + timedelta(days=1), "description": "", "pinned": False},
+    ])
+
+    html = client.get("/events").data.decode()
+    assert "Recurring" not in html
+    assert html.count("<strong>Trivia</strong>") in (12, 13)
+    assert "Every Thursday" in html
+    assert skipped.strftime("%b %e, %Y") not in html
+
+    to = today + timedelta(days=13)
+    data = client.get(f"/api/events?to={to.isoformat()}&fields=title,date").get_json()["data"]
+    assert [row["date"] for row in data] == sorted(row["date"] for row in data)
+    assert sum(row["title"] == "Trivia" for row in data) in (1, 2)
+    assert skipped.isoformat() not in [row["date"] for row in data]
+
+    feed = client.get("/events.ics").data.decode()
+    assert feed.count("BEGIN:VEVENT") == 2
+    assert "RRULE:FREQ=WEEKLY;INTERVAL=1;BYDAY=TH" in feed
+    assert f"EXDATE;VALUE=DATE:{skipped:%Y%m%d}" in feed
+
+
+def test_admin_adds_weekly_event_and_lists_next_dates(client):
+    login(client)
+    r = client.post("/admin-events", data={
+        "action": "add", "title": "Trivia", "date": "2026-06-01", "description": "",
+        "repeat": "weekly", "interval": "1", "weekday": "3",
+    })
+    assert r.status_code == 302
+    event = flask_app.app.extensions["content_store"].get_events()[0]
+    assert event["pinned"] is True
+    assert event["recurrence"]["weekday"] == 3
+    html = client.get("/admin-events").data.decode()
+    assert "Every Thursday" in html
+    assert "Next: " in html
+
+    r = client.post("/admin-events", data={
+        "action": "update", "id": event["id"], "title": "Trivia", "date": "2026-06-01", "description": "",
+        "repeat": "weekly", "interval": "40",
+    })
+    assert r.status_code == 400
+    assert "Repeat every 1 to 12 weeks." in r.data.decode()
+
+
+def test_sqlite_migration_adds_recurrence_column(tmp_path):
+    import sqlite3
+
+    from taps_and_takeout.sqlite_store import MIGRATIONS
+
+    path = str(tmp_path / "content.db")
+    conn = sqlite3.connect(path)
+    for statement in [statement for statements in MIGRATIONS[:2] for statement in statements]:
+        conn.execute(statement)
+    conn.execute("PRAGMA user_version = 2")
+    conn.execute("INSERT INTO events (id, position, title, date) VALUES ('old', 0, 'Before', '2026-06-01')")
+    conn.commit()
+    conn.close()
+
+    store = SqliteContentStore(path)
+    assert store.get_events() == [{"id": "old", "title": "Before", "date": date(2026, 6, 1), "description": "", "pinned": False}]
+    rule = {"freq": "weekly", "weekday": 4, "interval": 1, "exceptions": []}
+    added = store.add_event({"title": "Jazz", "date": "2026-06-05", "description": "", "pinned": True, "recurrence": rule})
+    assert store.get_events()[1]["recurrence"] == rule
+    store.update_event(added["id"], {"recurrence": None})
+    assert "recurrence" not in store.get_events()[1]
+
+
+# ---------------------------------------------------------------------------
+# Admission control tests
+# ---------------------------------------------------------------------------
+
+def test_admission_controller_queues_briefly_then_sheds():
+    controller = AdmissionController(max_in_flight=1, max_queued=1, queue_timeout=2)
+    assert controller.acquire()
+    waiter_result = []
+    waiter = threading.Thread(target=lambda: waiter_result.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    assert not controller.acquire()  # the queue is full, so this one is shed at once
+    controller.release()
+    waiter.join()
+    assert waiter_result == [True]
+    assert controller.stats() == {"in_flight": 1, "waiting": 0, "admitted": 2, "queued": 1, "shed": 1, "late": 0}
+
+    controller.queue_timeout = 0.01
+    assert not controller.acquire()
+    assert controller.stats()["shed"] == 2
+
+
+def test_saturated_worker_sheds_public_pages_but_not_healthz(client):
+    controller = flask_app.app.extensions["admission"]
+    saved = controller.in_flight, controller.max_queued
+    controller.in_flight, controller.max_queued = controller.max_in_flight, 0
+    try:
+        r = client.get("/menu")
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == str(flask_app.app.config["ADMISSION_RETRY_AFTER"])
+        health = client.get("/healthz")
+        assert health.status_code == 200
+        assert health.get_json()["admission"]["shed"] >= 1
+    finally:
+        controller.in_flight, controller.max_queued = saved
+    assert client.get("/menu").status_code == 200
+    assert controller.in_flight == saved[0]
+
+
+def test_queue_time_reads_request_start_in_any_unit():
+    now = 1_800_000_000.0
+    assert queue_time("t=1799999998500", now) == 1.5
+    assert queue_time("t=1799999999.250", now) == 0.75
+    assert queue_time("1799999999000000", now) == 1.0
+    assert queue_time("t=1800000005000", now) == 0.0  # clocks a little apart
+    assert queue_time("soon", now) is None
+
+
+def test_requests_that_queued_too_long_are_shed_before_taking_a_slot(client):
+    controller = flask_app.app.extensions["admission"]
+    before = controller.stats()
+    stale = f"t={(time.time() - 5) * 1000:.0f}"
+    r = client.get("/menu", headers={"X-Request-Start": stale})
+    assert r.status_code == 503
+    assert "Retry-After" in r.headers
+    assert client.get("/healthz", headers={"X-Request-Start": stale}).status_code == 200
+    after = controller.stats()
+    assert after["late"] == before["late"] + 1
+    assert after["admitted"] == before["admitted"]
+    assert client.get("/menu", headers={"X-Request-Start": f"t={time.time() * 1000:.0f}"}).status_code == 200
+
+
+def test_queue_timed_worker_stamps_only_the_wait_for_a_thread(monkeypatch):
+    seen = []
+    req = types.SimpleNamespace(headers=[("HOST", "example.com"), ("X-REQUEST-START", "t=1")])
+
+    def handle(self, conn):
+        time.sleep(0.3)  # the client takes its time sending the request
+        return self.handle_request(req, conn)
+
+    monkeypatch.setattr(ThreadWorker, "enqueue_req", lambda self, conn: None)
+    monkeypatch.setattr(ThreadWorker, "handle", handle)
+    monkeypatch.setattr(ThreadWorker, "handle_request", lambda self, req, conn: seen.append(req.headers))
+    worker = QueueTimedThreadWorker.__new__(QueueTimedThreadWorker)
+    conn = types.SimpleNamespace()
+    worker.enqueue_req(conn)
+    time.sleep(0.05)  # queued behind busy threads
+    worker.handle(conn)
+    assert seen[0][0] == ("HOST", "example.com")
+    name, value = seen[0][1]
+    assert name == "X-REQUEST-START" and len(seen[0]) == 2
+    assert 0.04 <= queue_time(value, time.time()) < 0.25
+
+
+def test_gunicorn_does_not_shed_clients_that_send_their_request_late(tmp_path, monkeypatch):
+    from http.client import HTTPConnection
+
+    from benchmarks.loadtest import _free_port, _prepare_workdir, start_server, stop_server
+
+    _prepare_workdir(str(tmp_path), 0)
+    config = tmp_path / "gunicorn.conf.py"
+    config.write_text('worker_class = "taps_and_takeout.workers.QueueTimedThreadWorker"\n')
+    monkeypatch.setenv("ADMISSION_MAX_QUEUE_TIME", "0.2")
+    port = _free_port()
+    server = start_server(str(tmp_path), port, workers=1, threads=1, config=str(config))
+    try:
+        conn = HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.connect()
+        for _ in range(2):  # a preconnected request, then a keep-alive one
+            time.sleep(0.5)
+            conn.request("GET", "/menu")
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200
+        conn.close()
+    finally:
+        stop_server(server)
+
+
+# ---------------------------------------------------------------------------
+# Metrics tests
+# ---------------------------------------------------------------------------
+
+def test_server_timing_reports_store_and_render(client):
+    flask_app.app.extensions["page_cache"].clear()
+    timing = client.get("/menu").headers["Server-Timing"]
+    phases = [part.split(";")[0] for part in timing.split(", ")]
+    assert {"store_load", "render", "total"} <= set(phases)
+
+    login(client)
+    timing = client.post("/admin-events", data={"action": "add", "title": "", "date": "", "description": ""}).headers["Server-Timing"]
+    assert "validate;dur=" in timing
+
+
+def test_metrics_endpoint_exposes_histograms(client):
+    client.get("/menu")
+    login(client)
+    body = client.get("/metrics").data.decode()
+    assert 'http_request_duration_seconds_count{endpoint="public.menu"}' in body
+    assert 'store_operation_duration_seconds_bucket{operation="version",le="+Inf"}' in body
+    assert "admission_shed_total" in body
+
+
+def test_metrics_endpoint_is_closed_without_admin_or_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setitem(flask_app.app.config, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_metrics_are_flushed_off_the_request_thread(tmp_path, monkeypatch):
+    import taps_and_takeout.metrics as metrics
+
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL", 0.01)
+    registry = MetricsRegistry(str(tmp_path))
+    registry.observe("http_request_duration_seconds", "public.menu", 0.002)
+    assert not (tmp_path / f"{os.getpid()}.json").exists()
+    registry.start_flusher()
+    registry.start_flusher()  # already running in this process
+    deadline = time.monotonic() + 5
+    while not (tmp_path / f"{os.getpid()}.json").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert json.loads((tmp_path / f"{os.getpid()}.json").read_text())["histograms"][0][1] == "public.menu"
+
+
+def test_metrics_registry_sums_workers_and_keeps_exited_ones(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.observe("http_request_duration_seconds", "public.menu", 0.002)
+    other = MetricsRegistry(str(tmp_path))
+    other.observe("http_request_duration_seconds", "public.menu", 0.3)
+    snapshot = other.snapshot()
+    # Pretend one worker is still running (our parent) and one has exited.
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(snapshot))
+    (tmp_path / "999999999.json").write_text(json.dumps(snapshot))
+
+    body = registry.render()
+    assert 'http_request_duration_seconds_count{endpoint="public.menu"} 3' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="public.menu",le="0.0025"} 1' in body
+    assert not (tmp_path / "999999999.json").exists()
+    assert 'http_request_duration_seconds_count{endpoint="public.menu"} 3' in registry.render()
+
+
+def test_admin_can_profile_a_request(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_DIR", str(tmp_path))
+    client.get("/menu?profile=1")
+    assert list(tmp_path.iterdir()) == []  # only admins may ask for a profile
+
+    login(client)
+    client.get("/menu?profile=1")
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert len(names) == 2 and names[0].endswith(".json") and names[1].endswith(".pstats")
+    page = client.get("/admin-profiles").data.decode()
+    assert "GET /menu" in page
+    name = names[0][: -len(".json")]
+    assert "cumulative" in client.get(f"/admin-profiles/{name}").data.decode()
+    assert client.get(f"/admin-profiles/{name}/download").status_code == 200
+    assert client.get("/admin-profiles/..%2Fsecret").status_code == 404
+
+
+def test_slow_mode_keeps_only_slow_requests_and_rotates(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_MODE", "slow")
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_KEEP", 2)
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_SLOW_MS", 10_000)
+    client.get("/contact")
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setitem(flask_app.app.config, "PROFILE_SLOW_MS", 0)
+    for _ in range(3):
+        client.get("/contact")
+        time.sleep(0.002)
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    assert len(list(tmp_path.glob("*.pstats"))) == 2
+
+
+# ---------------------------------------------------------------------------
+# Logging tests
+# ---------------------------------------------------------------------------
+
+def test_queued_logging_writes_structured_json_off_thread():
+    stream = io.StringIO()
+    handler = BatchingQueueHandler(stream)
+    handler.setFormatter(StructuredFormatter("%(levelname)s %(message)s"))
+    logger = logging.getLogger("taps_and_takeout.logging_utils")
+    logger.addHandler(handler)
+    try:
+        log_admin_action("event_added", title="Quiz", event_id="abc")
+        handler.flush()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    level, message, payload = stream.getvalue().strip().split(" ", 2)
+    assert (level, message) == ("INFO", "admin_action")
+    assert json.loads(payload) == {"action": "event_added", "event_id": "abc", "title": "Quiz"}
+    assert handler._thread.name == "log-writer" and not handler._thread.is_alive()
+
+
+def test_full_log_queue_drops_and_counts():
+    handler = BatchingQueueHandler(io.StringIO(), maxsize=1)
+    handler._pid = os.getpid()  # keep the writer thread from draining the queue
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "hello", None, None)
+    for _ in range(3):
+        handler.handle(record)
+    assert handler.dropped == 2
+
+
+def test_public_requests_are_access_logged(client, caplog):
+    with caplog.at_level(logging.INFO, logger="taps_and_takeout.access"):
+        client.get("/contact")
+    entries = [record.structured for record in caplog.records if record.name == "taps_and_takeout.access"]
+    assert entries[-1]["path"] == "/contact"
+    assert entries[-1]["status"] == 200
+    assert entries[-1]["duration_ms"] is not None
+    login(client)
+    assert "log_records_dropped_total" in client.get("/metrics").data.decode()
+
+
+# ---------------------------------------------------------------------------
+# Rate limit storage tests
+# ---------------------------------------------------------------------------
+
+def _hammer_counter(uri):
+    storage = storage_from_string(uri)
+    for _ in range(50):
+        storage.incr("login", 60)
+
+
+def test_sqlite_rate_limit_counters_shared_across_processes(tmp_path):
+    uri = f"sqlite:///{tmp_path}/ratelimit.db"
+    storage = storage_from_string(uri)
+    assert isinstance(storage, SqliteRateLimitStorage)
+    workers = [multiprocessing.get_context("fork").Process(target=_hammer_counter, args=(uri,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert storage.get("login") == 200
+    assert storage.get_expiry("login") > time.time()
+
+    assert storage.incr("short", 0) == 1
+    assert storage.get("short") == 0
+    assert storage.incr("short", 60) == 1
+    storage.clear("login")
+    assert storage.get("login") == 0
+    assert storage.check()
+
+
+# ---------------------------------------------------------------------------
+# Server warm-up tests
+# ---------------------------------------------------------------------------
+
+def test_warm_up_compiles_templates_and_fills_page_cache(client):
+    app = flask_app.app
+    app.extensions["page_cache"].clear()
+    app.jinja_env.cache.clear()
+    warm_up(app)
+    assert {"menu.html", "events.html", "admin_events.html"} <= {name for _, name in app.jinja_env.cache.keys()}
+    assert app.extensions["page_cache"].stats()["entries"] == 2
+    hits = app.extensions["page_cache"].hits
+    client.get("/menu")
+    assert app.extensions["page_cache"].hits == hits + 1
+
+
+def test_precompile_templates_fills_bytecode_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("JINJA_CACHE_DIR", str(tmp_path / "jinja"))
+    app = create_app()
+    result = app.test_cli_runner().invoke(args=["precompile-templates"])
+    templates = app.jinja_env.list_templates()
+    assert f"Compiled {len(templates)} template(s)" in result.output
+    assert len(list((tmp_path / "jinja").iterdir())) == len(templates)
+
+    fresh = create_app()
+    buckets = []
+    cache = fresh.jinja_env.bytecode_cache
+    original = cache.load_bytecode
+    monkeypatch.setattr(cache, "load_bytecode", lambda bucket: (original(bucket), buckets.append(bucket)))
+    fresh.jinja_env.get_template("menu.html")
+    assert buckets and all(bucket.code is not None for bucket in buckets)
+
+
+def test_gunicorn_config_preloads_and_jitters_recycling(monkeypatch):
+    import runpy
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    config = runpy.run_path(os.path.join(os.path.dirname(__file__), "gunicorn.conf.py"))
+    assert config["preload_app"] is True
+    assert config["workers"] == 3
+    assert config["max_requests"] > 0 and config["max_requests_jitter"] > 0
+    assert callable(config["when_ready"])
+
+
+def test_gunicorn_config_sizes_admission_from_the_worker_threads(monkeypatch):
+    import runpy
+
+    controller = flask_app.app.extensions["admission"]
+    monkeypatch.setattr(controller, "max_in_flight", controller.max_in_flight)
+    monkeypatch.delenv("ADMISSION_MAX_IN_FLIGHT", raising=False)
+    monkeypatch.setenv("GUNICORN_THREADS", "4")
+    config = runpy.run_path(os.path.join(os.path.dirname(__file__), "gunicorn.conf.py"))
+    # As with `gunicorn --threads 8 -c gunicorn.conf.py`.
+    worker = types.SimpleNamespace(wsgi=flask_app.app, cfg=types.SimpleNamespace(threads=8, preload_app=True))
+    config["post_worker_init"](worker)
+    assert controller.max_in_flight == 7
+
+    monkeypatch.setenv("ADMISSION_MAX_IN_FLIGHT", "5")
+    controller.max_in_flight = 5
+    config["post_worker_init"](worker)
+    assert controller.max_in_flight == 5
+
+
+# ---------------------------------------------------------------------------
+# Static asset tests
+# ---------------------------------------------------------------------------
+
+def test_pages_link_fingerprinted_assets(client):
+    fingerprint = flask_app.app.extensions["asset_manifest"]["style.css"]
+    html = client.get("/").data.decode()
+    assert f"/static/style.css?v={fingerprint}" in html
+    assert "/static/images/logo.png?v=" in html
+
+
+def test_fingerprinted_asset_is_immutable(client):
+    fingerprint = flask_app.app.extensions["asset_manifest"]["style.css"]
+    r = client.get(f"/static/style.css?v={fingerprint}")
+    assert r.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    r.close()
+    r = client.get("/static/style.css?v=stale")
+    assert "immutable" not in r.headers.get("Cache-Control", "")
+    r.close()
+
+
+def test_compress_static_writes_smaller_siblings(tmp_path):
+    (tmp_path / "style.css").write_text("body { color: red; }\n" * 200)
+    (tmp_path / "tiny.css").write_text("a{}")
+    written = compress_static(str(tmp_path))
+    assert (tmp_path / "style.css.gz").exists()
+    assert not (tmp_path / "tiny.css.gz").exists()
+    assert find_precompressed(str(tmp_path))["style.css"][-1] == "gzip"
+    assert compress_static(str(tmp_path)) == 0
+    assert written >= 1
+
+
+def test_precompressed_siblings_older_than_their_source_are_ignored(tmp_path):
+    source = tmp_path / "style.css"
+    source.write_text("body { color: red; }\n" * 200)
+    compress_static(str(tmp_path))
+    source.write_text("body { color: blue; }\n" * 200)
+    stamp = os.path.getmtime(source) - 10
+    for sibling in tmp_path.glob("style.css.*"):
+        os.utime(sibling, (stamp, stamp))
+    assert "style.css" not in find_precompressed(str(tmp_path))
+    compress_static(str(tmp_path))
+    assert find_precompressed(str(tmp_path))["style.css"][-1] == "gzip"
+
+
+def test_choose_encoding_prefers_brotli_and_respects_quality():
+    from werkzeug.datastructures import Accept
+
+    assert choose_encoding(Accept([("gzip", 1), ("br", 1)]), ["br", "gzip"]) == "br"
+    assert choose_encoding(Accept([("gzip", 1), ("br", 0.5)]), ["br", "gzip"]) == "gzip"
+    assert choose_encoding(Accept([("identity", 1)]), ["br", "gzip"]) is None
+
+
+def test_static_serves_precompressed_sibling(client, tmp_path, monkeypatch):
+    (tmp_path / "style.css").write_text("body { color: red; }\n" * 200)
+    compress_static(str(tmp_path))
+    monkeypatch.setattr(flask_app.app, "static_folder", str(tmp_path))
+    monkeypatch.setitem(flask_app.app.extensions, "precompressed", find_precompressed(str(tmp_path)))
+
+    r = client.get("/static/style.css", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.headers["Content-Type"].startswith("text/css")
+    assert "Accept-Encoding" in r.headers["Vary"]
+    assert gzip.decompress(r.data) == (tmp_path / "style.css").read_bytes()
+    r.close()
+    r = client.get("/static/style.css")
+    assert "Content-Encoding" not in r.headers
+    r.close()
+
+
+def test_logo_falls_back_to_plain_img_without_variants(client):
+    html = client.get("/").data.decode()
+    assert '<img src="/static/images/logo.png?v=' in html
+    assert 'class="logo"' in html
+    assert 'decoding="async"' in html
+    assert 'loading="lazy"' not in html
+
+
+def test_build_image_variants_and_picture(tmp_path):
+    image_module = pytest.importorskip("PIL.Image")
+    (tmp_path / "images").mkdir()
+    image_module.new("RGBA", (700, 350), (200, 40, 20, 255)).save(tmp_path / "images" / "logo.png")
+    index = build_image_variants(str(tmp_path))
+    entry = index["images/logo.png"]
+    assert [width for width, _ in entry["sources"]["fallback"]] == [320, 640, 700]
+    assert "image/webp" in entry["sources"]
+    assert (tmp_path / "variants" / "images" / "logo-320.webp").exists()
+    assert load_variant_index(str(tmp_path)) == index
+
+    with flask_app.app.test_request_context("/"):
+        flask_app.app.extensions["image_variants"] = index
+        try:
+            html = picture("images/logo.png", "Logo", sizes="320px")
+        finally:
+            flask_app.app.extensions["image_variants"] = {}
+    assert html.startswith("<picture><source")
+    assert 'type="image/webp"' in html
+    assert "/static/variants/images/logo-640.png 640w" in html
+    assert 'loading="lazy"' in html
+    assert 'width="700" height="350"' in html
+
+
 # ---------------------------------------------------------------------------
 # Auth tests
 # ---------------------------------------------------------------------------
@@ -245,7 +1371,7 @@ def test_update_event(client):
     events_module.save_events([{"title": "Old", "date": date(2026, 6, 1), "description": ""}])
     login(client)
     r = client.post("/admin-events", data={
-        "action": "update", "index": "0",
+        "action": "update", "id": "0",
         "title": "Updated", "date": "2026-06-01", "description": "",
     }, follow_redirects=True)
     html = r.data.decode()
@@ -256,7 +1382,7 @@ def test_update_event(client):
 def test_update_event_out_of_bounds(client):
     login(client)
     r = client.post("/admin-events", data={
-        "action": "update", "index": "999",
+        "action": "update", "id": "999",
         "title": "X", "date": "2026-06-01", "description": "",
     })
     assert r.status_code == 400
@@ -265,7 +1391,7 @@ def test_update_event_out_of_bounds(client):
 def test_update_event_non_numeric_index(client):
     login(client)
     r = client.post("/admin-events", data={
-        "action": "update", "index": "abc",
+        "action": "update", "id": "abc",
         "title": "X", "date": "2026-06-01", "description": "",
     })
     assert r.status_code == 400
@@ -275,7 +1401,7 @@ def test_delete_event(client):
     events_module.save_events([{"title": "Gone", "date": date(2026, 6, 1), "description": ""}])
     login(client)
     r = client.post("/admin-events", data={
-        "action": "delete", "index": "0",
+        "action": "delete", "id": "0",
         "title": "Gone", "date": "2026-06-01", "description": "",
     }, follow_redirects=True)
     assert events_module.load_events() == []
@@ -285,16 +1411,96 @@ def test_delete_event(client):
 def test_delete_event_out_of_bounds(client):
     login(client)
     r = client.post("/admin-events", data={
-        "action": "delete", "index": "999",
+        "action": "delete", "id": "999",
         "title": "X", "date": "2026-06-01", "description": "",
     })
     assert r.status_code == 400
 
 
+def test_event_ids_survive_other_deletions(client):
+    events_module.save_events([
+        {"title": "First", "date": date(2026, 6, 1), "description": ""},
+        {"title": "Second", "date": date(2026, 6, 2), "description": ""},
+    ])
+    store = flask_app.app.extensions["content_store"]
+    first_id, second_id = [event["id"] for event in store.get_events()]
+    login(client)
+    client.post("/admin-events", data={"action": "delete", "id": first_id})
+    r = client.post("/admin-events", data={
+        "action": "update", "id": second_id,
+        "title": "Second Updated", "date": "2026-06-02", "description": "",
+    })
+    assert r.status_code == 302
+    assert [(event["id"], event["title"]) for event in store.get_events()] == [(second_id, "Second Updated")]
+
+
+def test_stale_event_id_rejected(client):
+    login(client)
+    client.post("/admin-events", data={"action": "add", "title": "Gone Soon", "date": "2026-06-01", "description": ""})
+    event_id = events_module.load_events()[0]["id"]
+    client.post("/admin-events", data={"action": "delete", "id": event_id})
+    r = client.post("/admin-events", data={"action": "delete", "id": event_id})
+    assert r.status_code == 400
+    assert "Invalid event" in r.data.decode()
+
+
+def test_admin_events_paginates_and_filters(client, monkeypatch):
+    import taps_and_takeout.routes.admin as admin_routes
+
+    monkeypatch.setattr(admin_routes, "ADMIN_EVENTS_PER_PAGE", 2)
+    events_module.save_events(
+        [{"title": f"Gig {n}", "date": date(2026, 6, n + 1), "description": "", "pinned": False} for n in range(5)]
+    )
+    login(client)
+    html = client.get("/admin-events").data.decode()
+    assert "Gig 0" in html and "Gig 1" in html and "Gig 2" not in html
+    assert "Page 1 of 3" in html
+
+    html = client.get("/admin-events?page=3").data.decode()
+    assert "Gig 4" in html and "Gig 3" not in html
+    html = client.get("/admin-events?page=99").data.decode()
+    assert "Page 3 of 3" in html
+
+    html = client.get("/admin-events?from=2026-06-02&to=2026-06-03").data.decode()
+    assert "Gig 1" in html and "Gig 2" in html and "Gig 0" not in html
+    assert "2 event(s)" in html
+    assert "No events match." in client.get("/admin-events?q=karaoke").data.decode()
+
+
+def test_admin_row_edit_stays_on_its_page(client, monkeypatch):
+    import taps_and_takeout.routes.admin as admin_routes
+
+    monkeypatch.setattr(admin_routes, "ADMIN_EVENTS_PER_PAGE", 2)
+    events_module.save_events(
+        [{"title": f"Gig {n}", "date": date(2026, 6, n + 1), "description": "", "pinned": False} for n in range(5)]
+    )
+    store = flask_app.app.extensions["content_store"]
+    event_id = next(event["id"] for event in store.get_events() if event["title"] == "Gig 2")
+    login(client)
+
+    r = client.post("/admin-events?page=2&q=gig", data={"action": "update", "id": event_id, "title": "", "date": "2026-06-03", "description": ""})
+    assert r.status_code == 400
+    html = r.data.decode()
+    assert "Page 2 of 3" in html and "Gig 3" in html and "Gig 0" not in html
+    assert 'action="/admin-events?' in html and "page=2" in html
+
+    r = client.post("/admin-events?page=2&q=gig", data={"action": "update", "id": event_id, "title": "Gig Two", "date": "2026-06-03", "description": ""})
+    assert r.status_code == 302
+    assert "page=2" in r.headers["Location"] and "q=gig" in r.headers["Location"]
+
+
 # ---------------------------------------------------------------------------
 # Pinned event tests
 # ---------------------------------------------------------------------------
 
+def test_events_page_without_events_shows_empty_state(client):
+    events_module.save_events([])
+    html = client.get("/events").data.decode()
+    assert "just ask your server" in html
+    assert "<ul>" not in html
+    assert "Subscribe" not in html
+
+
 def test_pinned_event_always_shows(client):
     events_module.save_events([
         {"title": "Pinned", "date": date(2000, 1, 1), "description": "", "pinned": True},
@@ -368,7 +1574,7 @@ def test_delete_section(client):
     menu_module.save_menu([{"section": "Temporary", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "delete_section", "section_index": "0",
+        "action": "delete_section", "section_id": "0",
     }, follow_redirects=True)
     assert menu_module.load_menu() == []
     assert "Deleted section" in r.data.decode()
@@ -377,7 +1583,7 @@ def test_delete_section(client):
 def test_delete_section_out_of_bounds(client):
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "delete_section", "section_index": "999",
+        "action": "delete_section", "section_id": "999",
     })
     assert r.status_code == 400
 
@@ -385,7 +1591,7 @@ def test_delete_section_out_of_bounds(client):
 def test_delete_section_non_numeric_index(client):
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "delete_section", "section_index": "abc",
+        "action": "delete_section", "section_id": "abc",
     })
     assert r.status_code == 400
 
@@ -394,7 +1600,7 @@ def test_add_item(client):
     menu_module.save_menu([{"section": "Drinks", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "add_item", "section_index": "0",
+        "action": "add_item", "section_id": "0",
         "item_name": "Lager", "item_description": "$5",
     }, follow_redirects=True)
     assert "Lager" in r.data.decode()
@@ -404,7 +1610,7 @@ def test_add_item_empty_name(client):
     menu_module.save_menu([{"section": "Drinks", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "add_item", "section_index": "0",
+        "action": "add_item", "section_id": "0",
         "item_name": "  ", "item_description": "",
     })
     assert r.status_code == 400
@@ -423,7 +1629,7 @@ def test_add_item_description_length_limit(client):
     menu_module.save_menu([{"section": "Drinks", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "add_item", "section_index": "0",
+        "action": "add_item", "section_id": "0",
         "item_name": "Lager", "item_description": "D" * 401,
     })
     assert r.status_code == 400
@@ -434,7 +1640,7 @@ def test_update_item(client):
     menu_module.save_menu([{"section": "S", "items": [{"name": "Old", "description": ""}]}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "update_item", "section_index": "0", "item_index": "0",
+        "action": "update_item", "section_id": "0", "item_id": "0",
         "item_name": "New", "item_description": "Better",
     }, follow_redirects=True)
     html = r.data.decode()
@@ -446,7 +1652,7 @@ def test_update_item_out_of_bounds(client):
     menu_module.save_menu([{"section": "S", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "update_item", "section_index": "0", "item_index": "999",
+        "action": "update_item", "section_id": "0", "item_id": "999",
         "item_name": "X", "item_description": "",
     })
     assert r.status_code == 400
@@ -456,7 +1662,7 @@ def test_update_item_non_numeric_index(client):
     menu_module.save_menu([{"section": "S", "items": [{"name": "Old", "description": ""}]}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "update_item", "section_index": "0", "item_index": "abc",
+        "action": "update_item", "section_id": "0", "item_id": "abc",
         "item_name": "X", "item_description": "",
     })
     assert r.status_code == 400
@@ -466,9 +1672,9 @@ def test_delete_item(client):
     menu_module.save_menu([{"section": "S", "items": [{"name": "Gone", "description": ""}]}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "delete_item", "section_index": "0", "item_index": "0",
+        "action": "delete_item", "section_id": "0", "item_id": "0",
     }, follow_redirects=True)
-    assert menu_module.load_menu() == [{"section": "S", "items": []}]
+    assert [section["items"] for section in menu_module.load_menu()] == [[]]
     assert "Deleted item" in r.data.decode()
 
 
@@ -476,6 +1682,6 @@ def test_delete_item_out_of_bounds(client):
     menu_module.save_menu([{"section": "S", "items": []}])
     login(client)
     r = client.post("/admin-menu", data={
-        "action": "delete_item", "section_index": "0", "item_index": "999",
+        "action": "delete_item", "section_id": "0", "item_id": "999",
     })
     assert r.status_code == 400